@@ -0,0 +1,220 @@
+import numpy as np
+
+from dealer_odds import BLACKJACK, BUST, CARD_VALUES, dealer_probabilities, shoe_composition
+from strategy import Action, Strategy
+
+CODES = {Action.HIT: "H", Action.STAND: "S", Action.DOUBLE_DOWN: "D", Action.SPLIT: "P"}
+
+# EV of standing on the totals 0 to 21 is this matrix times the probabilities of the dealer's results,
+# which are 17, 18, 19, 20, 21, bust and blackjack
+STAND = np.zeros((22, 7))
+STAND[:, :5] = np.sign(np.arange(22)[:, None] - np.arange(17, 22))
+STAND[:, BUST] = 1
+STAND[:, BLACKJACK] = -1
+
+
+def _add(total: int, soft: int, value: int):
+    """Adds a card value to a total with `soft` aces counted as 11, like `Hand.append`"""
+    total += value
+    soft += value == 11
+    if total > 21 and soft > 0:
+        total -= 10
+        soft -= 1
+    return total, soft
+
+
+def _remove(shoe: tuple, index: int) -> tuple:
+    """The composition `shoe` with one card of the `index`-th value taken out"""
+    return shoe[:index] + (shoe[index] - 1,) + shoe[index + 1:]
+
+
+class Analyzer:
+    """
+    Computes the expected value of hitting, standing, doubling down and splitting
+    for every hand against every dealer upcard, for a given shoe composition.
+
+    Every decision is evaluated with the cards that are actually left in the shoe: the upcard,
+    the player's cards and every card the player draws are taken out before the dealer's results
+    are computed, so the EVs of a hand depend on the cards it holds and not only on its total.
+    Sub-hands are memoized on their composition, total and soft aces, and the dealer's results
+    on the composition (see dealer_odds.py), so a full chart takes several seconds.
+
+    The EV of a total is the average over the two card hands that make it, weighted by how likely
+    they are to be delt. Splits are evaluated for one of the hands and doubled: the second hand
+    is played with the cards of the first still in the shoe, and split hands are never split again.
+
+    The EVs are in units of the initial bet. The dealer doesn't peek for blackjack,
+    so all bets of a hand, including doubled and split ones, are lost to a dealer blackjack,
+    except for a split hand of 21 with two cards, which pushes like in `Dealer.settle`.
+    """
+
+    def __init__(self, composition, double_after_split: bool = True) -> None:
+        self.composition = tuple(composition)
+        self.double_after_split = double_after_split
+        # dealer results and EV of standing per (upcard, composition)
+        self._dealer = {}
+        # EV of hitting per (upcard, composition, total, soft)
+        self._memo = {}
+
+    @staticmethod
+    def for_decks(number_of_decks: int, double_after_split: bool = True) -> "Analyzer":
+        """Creates an analyzer for a full shoe"""
+        return Analyzer(shoe_composition(number_of_decks), double_after_split)
+
+    def _shoe(self, upcard: int, *values) -> tuple:
+        """The composition with the upcard and the given card values taken out"""
+        shoe = self.composition
+        for value in (upcard,) + values:
+            shoe = _remove(shoe, value - 2)
+            if shoe[value - 2] < 0:
+                raise ValueError(f"There are not enough cards of value {value} in the shoe")
+        return shoe
+
+    def _results(self, shoe: tuple, upcard: int):
+        """
+        The dealer's results for an upcard when drawing from `shoe`
+        and the EV of standing on every total 0 to 21 against them
+        """
+        key = (upcard, shoe)
+        if key not in self._dealer:
+            dealer = dealer_probabilities(upcard, shoe)
+            self._dealer[key] = (dealer, STAND @ dealer)
+        return self._dealer[key]
+
+    def _stand(self, shoe: tuple, total: int, upcard: int) -> float:
+        if total > 21:
+            return -1.0
+        return self._results(shoe, upcard)[1][total]
+
+    def _split_21(self, shoe: tuple, upcard: int) -> float:
+        """EV of a split hand of 21 with two cards, which pushes against a dealer blackjack"""
+        dealer, stand = self._results(shoe, upcard)
+        return stand[21] + dealer[BLACKJACK]
+
+    def _hit(self, shoe: tuple, total: int, soft: int, upcard: int) -> float:
+        """EV of hitting and then playing on optimally with hits and stands"""
+        key = (upcard, shoe, total, soft)
+        if key not in self._memo:
+            remaining = sum(shoe)
+            ev = 0.0
+            for i, n in enumerate(shoe):
+                if n == 0:
+                    continue
+                p = n / remaining
+                new_total, new_soft = _add(total, soft, CARD_VALUES[i])
+                if new_total > 21:
+                    ev -= p
+                    continue
+                rest = _remove(shoe, i)
+                stand = self._stand(rest, new_total, upcard)
+                # the dealer doesn't ask for a decision on 21
+                if new_total < 21:
+                    stand = max(stand, self._hit(rest, new_total, new_soft, upcard))
+                ev += p * stand
+            self._memo[key] = ev
+        return self._memo[key]
+
+    def _double(self, shoe: tuple, total: int, soft: int, upcard: int) -> float:
+        """EV of doubling down, i.e. taking exactly one more card for twice the bet"""
+        remaining = sum(shoe)
+        ev = 0.0
+        for i, n in enumerate(shoe):
+            if n > 0:
+                ev += n / remaining * self._stand(_remove(shoe, i), _add(total, soft, CARD_VALUES[i])[0], upcard)
+        return 2 * ev
+
+    def _split(self, value: int, upcard: int) -> float:
+        """
+        EV of splitting a pair of `value`. Split hands can't be split again,
+        split aces receive a single card.
+        """
+        shoe = self._shoe(upcard, value, value)
+        remaining = sum(shoe)
+        ev = 0.0
+        for i, n in enumerate(shoe):
+            if n == 0:
+                continue
+            p = n / remaining
+            rest = _remove(shoe, i)
+            total, soft = _add(*_add(0, 0, value), CARD_VALUES[i])
+            if total == 21:
+                ev += p * self._split_21(rest, upcard)
+            elif value == 11:
+                ev += p * self._stand(rest, total, upcard)
+            else:
+                options = [self._stand(rest, total, upcard), self._hit(rest, total, soft, upcard)]
+                if self.double_after_split:
+                    options.append(self._double(rest, total, soft, upcard))
+                ev += p * max(options)
+        return 2 * ev
+
+    def hand_evs(self, first: int, second: int, upcard: int) -> dict:
+        """EVs of hitting, standing and doubling down on a hand of two card values against an upcard value"""
+        shoe = self._shoe(upcard, first, second)
+        total, soft = _add(*_add(0, 0, first), second)
+        return {
+            Action.HIT: self._hit(shoe, total, soft, upcard),
+            Action.STAND: self._stand(shoe, total, upcard),
+            Action.DOUBLE_DOWN: self._double(shoe, total, soft, upcard),
+        }
+
+    def evs(self, total: int, soft: bool, upcard: int) -> dict:
+        """
+        EVs of hitting, standing and doubling down on a two card total against an upcard value,
+        averaged over the hands that make the total
+        """
+        shoe = self._shoe(upcard)
+        remaining = sum(shoe)
+        evs = dict.fromkeys((Action.HIT, Action.STAND, Action.DOUBLE_DOWN), 0.0)
+        weights = 0.0
+        for i, first in enumerate(CARD_VALUES):
+            for j, second in enumerate(CARD_VALUES[i:], i):
+                if _add(*_add(0, 0, first), second) != (total, int(soft)):
+                    continue
+                # probability of being delt these two cards, in any order
+                weight = shoe[i] * (shoe[j] - (i == j)) * (1 if i == j else 2) / (remaining * (remaining - 1))
+                if weight <= 0:
+                    continue
+                weights += weight
+                for action, ev in self.hand_evs(first, second, upcard).items():
+                    evs[action] += weight * ev
+        if weights == 0:
+            raise ValueError(f"No two cards left in the shoe make a {'soft' if soft else 'hard'} {total}")
+        return {action: ev / weights for action, ev in evs.items()}
+
+    def pair_evs(self, value: int, upcard: int) -> dict:
+        """EVs of every action for a pair of cards of `value` against an upcard value"""
+        evs = self.hand_evs(value, value, upcard)
+        evs[Action.SPLIT] = self._split(value, upcard)
+        return evs
+
+    def chart(self) -> dict:
+        """Computes the best action for every hand in the chart format read by `Strategy`"""
+        def best(evs: dict) -> str:
+            return CODES[max(evs, key=evs.get)]
+
+        hard = {str(total): "".join(best(self.evs(total, False, up)) for up in CARD_VALUES)
+                for total in range(4, 21)}
+        hard["21"] = "S" * len(CARD_VALUES)
+        soft = {str(total): "".join(best(self.evs(total, True, up)) for up in CARD_VALUES)
+                for total in range(12, 22)}
+
+        pair = {}
+        for value in CARD_VALUES:
+            row = ""
+            for up in CARD_VALUES:
+                evs = self.pair_evs(value, up)
+                row += "P" if best(evs) == "P" else "-"
+            pair["A" if value == 11 else str(value)] = row
+
+        return {
+            "name": f"Computed strategy ({sum(self.composition)} cards)",
+            "double_after_split": self.double_after_split,
+            "hard": hard,
+            "soft": soft,
+            "pair": pair,
+        }
+
+    def strategy(self) -> Strategy:
+        """Computes the best strategy for the shoe, ready to be passed to the players"""
+        return Strategy(self.chart())
@@ -0,0 +1,145 @@
+import numpy as np
+
+# Number of path-rounds drawn at once, bounds the memory of a simulation
+BLOCK = 1 << 23
+# Number of equally likely buckets of the lookup table used for sampling
+BUCKETS = 1 << 16
+
+
+class Distribution:
+    """Distribution of the net winnings of one round"""
+
+    def __init__(self, outcomes, probabilities) -> None:
+        outcomes = np.asarray(outcomes, dtype=np.int64)
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        keep = probabilities > 0
+        self.outcomes = outcomes[keep]
+        self.probabilities = probabilities[keep] / probabilities[keep].sum()
+        self.cdf = np.cumsum(self.probabilities)
+        self.cdf[-1] = 1.0
+
+        # most buckets of [0, 1) lie within a single outcome of the cdf, so a random number
+        # is turned into an outcome with one lookup. Only the few buckets containing
+        # the border between two outcomes need a binary search
+        edges = np.arange(BUCKETS + 1) / BUCKETS
+        last = len(self.outcomes) - 1
+        first = np.minimum(np.searchsorted(self.cdf, edges[:-1], side="right"), last)
+        end = np.minimum(np.searchsorted(self.cdf, np.nextafter(edges[1:], 0), side="right"), last)
+        self.table = self.outcomes[first]
+        self.ambiguous = first != end
+
+    @staticmethod
+    def from_outcomes(statistic) -> "Distribution":
+        """The empirical distribution collected by a `stats.Outcomes` statistic during a `Dealer` run"""
+        report = statistic.report()
+        return Distribution(report["outcomes"], report["counts"])
+
+    @staticmethod
+    def from_histogram(histogram, bets) -> "Distribution":
+        """
+        The distribution of a card counter that bets `bets[i]` at the i-th true count of a
+        `stats.TrueCountHistogram`, which has to be recorded with a bet in every round.
+        The outcomes in units of the histogram are scaled by the bet of their true count.
+        """
+        bets = np.asarray(bets, dtype=np.int64)
+        outcomes = bets[:, None] * histogram.outcomes()[None, :]
+        return Distribution(outcomes.ravel(), histogram.counts.ravel())
+
+    def mean(self) -> float:
+        return float(self.outcomes @ self.probabilities)
+
+    def std(self) -> float:
+        return float(np.sqrt(((self.outcomes - self.mean()) ** 2) @ self.probabilities))
+
+    def n0(self) -> float:
+        """
+        Number of rounds after which the expected winnings equal one standard deviation
+        of the total winnings, i.e. after which skill starts to outweigh luck
+        """
+        mean = self.mean()
+        return self.std() ** 2 / mean ** 2 if mean != 0 else np.inf
+
+    def sample(self, rng: np.random.Generator, shape) -> np.ndarray:
+        """Draws the winnings of `shape` independent rounds"""
+        uniform = rng.random(shape)
+        buckets = (uniform * BUCKETS).astype(np.intp)
+        samples = self.table[buckets]
+        ambiguous = self.ambiguous[buckets]
+        samples[ambiguous] = self.outcomes[np.searchsorted(self.cdf, uniform[ambiguous], side="right")]
+        return samples
+
+
+class RuinResult:
+    """Outcome of simulating many bankrolls, see `simulate_bankroll`"""
+
+    def __init__(self, distribution: Distribution, bankroll: int, rounds: int, ruined_at, final) -> None:
+        self.distribution = distribution
+        self.bankroll = bankroll
+        self.rounds = rounds
+        # round in which every path went broke, -1 if it survived
+        self.ruined_at = ruined_at
+        # bankroll of every path after the last round, 0 for the ruined ones
+        self.final = final
+
+    @property
+    def paths(self) -> int:
+        return len(self.ruined_at)
+
+    def ruin_probability(self, rounds: int = None) -> float:
+        """Probability to go broke within `rounds` rounds, by default within all rounds simulated"""
+        rounds = self.rounds if rounds is None else rounds
+        ruined = self.ruined_at[self.ruined_at >= 0]
+        return np.count_nonzero(ruined < rounds) / self.paths
+
+    def time_to_ruin(self, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)) -> np.ndarray:
+        """Quantiles of the round of ruin of the paths that went broke"""
+        ruined = self.ruined_at[self.ruined_at >= 0]
+        if len(ruined) == 0:
+            return np.full(len(quantiles), np.nan)
+        return np.quantile(ruined, quantiles)
+
+    def report(self) -> dict:
+        return {
+            "bankroll": self.bankroll,
+            "rounds": self.rounds,
+            "paths": self.paths,
+            "ev": self.distribution.mean(),
+            "std": self.distribution.std(),
+            "n0": self.distribution.n0(),
+            "ruin_probability": self.ruin_probability(),
+            "time_to_ruin": self.time_to_ruin(),
+            "mean_final": self.final.mean(),
+        }
+
+
+def simulate_bankroll(distribution: Distribution, bankroll: int, rounds: int, paths: int = 100_000,
+                      rng: np.random.Generator = None) -> RuinResult:
+    """
+    Plays `rounds` rounds on `paths` bankrolls of `bankroll` at once, drawing the winnings
+    of every round from `distribution`. A bankroll that drops to 0 or below is ruined and stops playing.
+
+    Rounds are drawn in blocks, only for the paths that are still alive,
+    so millions of path-rounds take a fraction of a second.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    budgets = np.full(paths, bankroll, dtype=np.int64)
+    ruined_at = np.full(paths, -1, dtype=np.int64)
+    alive = np.arange(paths)
+
+    played = 0
+    while played < rounds and len(alive):
+        steps = max(1, min(rounds - played, BLOCK // len(alive)))
+        totals = np.cumsum(distribution.sample(rng, (len(alive), steps)), axis=1)
+        totals += budgets[alive, None]
+
+        broke = totals <= 0
+        ruined = broke.any(axis=1)
+        first = broke.argmax(axis=1)
+
+        ruined_at[alive[ruined]] = played + first[ruined]
+        budgets[alive[ruined]] = 0
+        budgets[alive[~ruined]] = totals[~ruined, -1]
+        alive = alive[~ruined]
+        played += steps
+
+    return RuinResult(distribution, bankroll, rounds, ruined_at, budgets)
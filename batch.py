@@ -0,0 +1,252 @@
+import numpy as np
+
+from deck import VALUE_TABLE, new_shoe
+from parallel import SimulationResult
+from strategy import BASIC_STRATEGY, Action, Strategy
+
+HIT = Action.HIT.value
+STAND = Action.STAND.value
+DOUBLE_DOWN = Action.DOUBLE_DOWN.value
+SPLIT = Action.SPLIT.value
+
+
+class BatchEngine:
+    """
+    Plays many independent single seat tables ("lanes") at once using NumPy arrays.
+
+    Every lane has its own shoe and plays a fixed strategy chart with a fixed bet,
+    which is what `Optimal_Player` does at a `Dealer` table.
+    Cards are dealt in the same order as `Dealer` deals them to a single player,
+    so the rules, payouts and statistics are the same as with `Dealer.play`.
+    """
+
+    def __init__(self, lanes: int, number_of_decks: int = 6, shuffle_point: float = 0.75,
+                 strategy: Strategy = BASIC_STRATEGY, bet: int = 100,
+                 rng: np.random.Generator = None) -> None:
+        self.lanes = lanes
+        self.bet = bet
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.hard_table, self.soft_table, self.pair_table = strategy.arrays()
+        self.double_after_split = strategy.double_after_split
+
+        # the shoes only hold blackjack values, suites don't matter here
+        shoe = VALUE_TABLE[new_shoe(number_of_decks)].astype(np.int8)
+        self.values = self.rng.permuted(np.tile(shoe, (lanes, 1)), axis=1)
+        self.top = np.zeros(lanes, dtype=np.intp)
+        self.stop_card_index = int(shuffle_point * len(shoe))
+        self.index = np.arange(lanes)
+
+        self._allocate(4)
+
+    def _allocate(self, hands: int) -> None:
+        """(Re)allocates room for `hands` hands per lane"""
+        self.total = np.zeros((self.lanes, hands), dtype=np.int16)
+        self.soft = np.zeros((self.lanes, hands), dtype=np.int8)
+        self.size = np.zeros((self.lanes, hands), dtype=np.int16)
+        self.first = np.zeros((self.lanes, hands), dtype=np.int8)
+        self.pair = np.zeros((self.lanes, hands), dtype=bool)
+        self.stake = np.zeros((self.lanes, hands), dtype=np.int8)
+        self.done = np.zeros((self.lanes, hands), dtype=bool)
+
+    def _grow(self) -> None:
+        """Doubles the number of hands every lane can hold"""
+        for name in ("total", "soft", "size", "first", "pair", "stake", "done"):
+            old = getattr(self, name)
+            setattr(self, name, np.concatenate((old, np.zeros_like(old)), axis=1))
+
+    def shuffle(self) -> None:
+        """Shuffles the shoe of every lane that passed its shuffle point"""
+        lanes = np.flatnonzero(self.top > self.stop_card_index)
+        if lanes.size:
+            self.values[lanes] = self.rng.permuted(self.values[lanes], axis=1)
+            self.top[lanes] = 0
+
+    def _draw(self, lanes: np.ndarray) -> np.ndarray:
+        """Picks the top card of the shoe of every lane in `lanes`"""
+        values = self.values[lanes, self.top[lanes]]
+        self.top[lanes] += 1
+        return values
+
+    def _add(self, lanes: np.ndarray, hands: np.ndarray, values: np.ndarray) -> None:
+        """Adds a card to hand `hands[i]` of lane `lanes[i]`, like `Hand.append`"""
+        total = self.total[lanes, hands] + values
+        soft = self.soft[lanes, hands] + (values == 11)
+        size = self.size[lanes, hands] + 1
+        for _ in range(2):
+            over = (total > 21) & (soft > 0)
+            total -= 10 * over
+            soft -= over
+
+        self.total[lanes, hands] = total
+        self.soft[lanes, hands] = soft
+        self.size[lanes, hands] = size
+        self.pair[lanes, hands] = (size == 2) & (self.first[lanes, hands] == values)
+
+    def _reset(self, lanes: np.ndarray, hands: np.ndarray, values: np.ndarray) -> None:
+        """Makes hand `hands[i]` of lane `lanes[i]` a new hand holding a single card"""
+        self.total[lanes, hands] = values
+        self.soft[lanes, hands] = values == 11
+        self.size[lanes, hands] = 1
+        self.first[lanes, hands] = values
+        self.pair[lanes, hands] = False
+        self.stake[lanes, hands] = 1
+        self.done[lanes, hands] = False
+
+    def play_round(self):
+        """
+        Plays one round on every lane.
+
+        Returns the net winnings, wins, draws and losses of every lane.
+        """
+        lanes = self.index
+        bet = self.bet
+        self.shuffle()
+
+        # Deal the dealer's cards, then the initial 2 card hand
+        upcard = self._draw(lanes)
+        hole = self._draw(lanes)
+        dealer_total = upcard.astype(np.int16) + hole
+        dealer_soft = (upcard == 11).astype(np.int8) + (hole == 11)
+        over = dealer_total > 21
+        dealer_total -= 10 * over
+        dealer_soft -= over
+        dealer_size = np.full(self.lanes, 2, dtype=np.int16)
+
+        zeros = np.zeros(self.lanes, dtype=np.intp)
+        self._reset(lanes, zeros, self._draw(lanes))
+        self._add(lanes, zeros, self._draw(lanes))
+        hands = np.ones(self.lanes, dtype=np.intp)
+        current = np.zeros(self.lanes, dtype=np.intp)
+        blackjack = np.zeros(self.lanes, dtype=bool)
+
+        # Iterate through each hand yet to be delt with, one decision per lane at a time
+        while True:
+            playing = np.flatnonzero(current < hands)
+            if not playing.size:
+                break
+            hand = current[playing]
+            total = self.total[playing, hand]
+
+            # Hand is bust or 21, or a split ace that is already finished
+            finished = (total >= 21) | self.done[playing, hand]
+            blackjack[playing] |= finished & (total == 21) & (hand == 0) & \
+                (hands[playing] == 1) & (self.size[playing, hand] == 2)
+            current[playing[finished]] += 1
+
+            playing = playing[~finished]
+            hand = hand[~finished]
+            total = total[~finished]
+            up = upcard[playing]
+
+            # Look up the strategy
+            decision = np.where(self.soft[playing, hand] > 0,
+                                self.soft_table[total, up], self.hard_table[total, up])
+            split_decision = self.pair_table[self.first[playing, hand], up]
+            decision = np.where(self.pair[playing, hand] & (split_decision >= 0),
+                                split_decision, decision)
+            if not self.double_after_split:
+                # every hand of a lane that holds more than one hand is a split hand
+                decision = np.where((decision == DOUBLE_DOWN) & (hands[playing] > 1), HIT, decision)
+
+            hit = decision == HIT
+            self._add(playing[hit], hand[hit], self._draw(playing[hit]))
+
+            stand = decision == STAND
+            current[playing[stand]] += 1
+
+            double = decision == DOUBLE_DOWN
+            lane, h = playing[double], hand[double]
+            self._add(lane, h, self._draw(lane))
+            self.stake[lane, h] = 2
+            current[lane] += 1
+
+            split = decision == SPLIT
+            if split.any():
+                lane, h = playing[split], hand[split]
+                if (hands[lane] == self.total.shape[1]).any():
+                    self._grow()
+                new = hands[lane]
+                hands[lane] += 1
+                card = self.first[lane, h].copy()
+                self._reset(lane, h, card)
+                self._reset(lane, new, card)
+
+                # split aces get one card each and are finished,
+                # other hands get their second card after the new hand
+                aces = card == 11
+                lane_a, h_a, new_a = lane[aces], h[aces], new[aces]
+                self._add(lane_a, h_a, self._draw(lane_a))
+                self._add(lane_a, new_a, self._draw(lane_a))
+                self.done[lane_a, new_a] = True
+                current[lane_a] += 1
+
+                lane_o, h_o, new_o = lane[~aces], h[~aces], new[~aces]
+                self._add(lane_o, new_o, self._draw(lane_o))
+                self._add(lane_o, h_o, self._draw(lane_o))
+
+        # Dealer picks cards until reaching 17 or over
+        while True:
+            drawing = np.flatnonzero(dealer_total < 17)
+            if not drawing.size:
+                break
+            values = self._draw(drawing)
+            total = dealer_total[drawing] + values
+            soft = dealer_soft[drawing] + (values == 11)
+            over = (total > 21) & (soft > 0)
+            dealer_total[drawing] = total - 10 * over
+            dealer_soft[drawing] = soft - over
+            dealer_size[drawing] += 1
+
+        # Determine winners of every hand, see `Dealer.player_won`
+        valid = np.arange(self.total.shape[1]) < hands[:, None]
+        player = self.total
+        dealer = dealer_total[:, None]
+        won = (player <= 21) & (player != dealer) & ((dealer > 21) | (player > dealer))
+        draw = (player <= 21) & (player == dealer)
+        dealer_blackjack = ((dealer_total == 21) & (dealer_size == 2))[:, None]
+        draw = np.where(dealer_blackjack, (player == 21) & (self.size == 2), draw)
+        won &= ~dealer_blackjack
+        won &= valid
+        draw &= valid
+
+        winnings = won * (2 * bet * self.stake.astype(np.int64))
+        # a blackjack pays 1.5 times the potential winnings
+        winnings[:, 0] += won[:, 0] * blackjack * (int(1.5 * 2 * bet) - 2 * bet)
+        winnings += draw * bet
+        stakes = (valid * self.stake).sum(axis=1, dtype=np.int64)
+        net = winnings.sum(axis=1) - bet * stakes
+
+        wins = won.sum(axis=1)
+        draws = draw.sum(axis=1)
+        losses = valid.sum(axis=1) - wins - draws
+        return net, wins, draws, losses
+
+    def play(self, n_rounds: int, record_every: int = 1) -> SimulationResult:
+        """
+        Plays `n_rounds` rounds spread over all lanes.
+
+        The rounds are ordered round by round across the lanes,
+        rounds of the last batch that exceed `n_rounds` are discarded.
+        """
+        nets = []
+        wins = draws = losses = 0
+        remaining = n_rounds
+        while remaining > 0:
+            net, w, d, l = self.play_round()
+            n = min(remaining, self.lanes)
+            nets.append(net[:n])
+            wins += int(w[:n].sum())
+            draws += int(d[:n].sum())
+            losses += int(l[:n].sum())
+            remaining -= n
+
+        nets = np.concatenate(nets) if nets else np.zeros(0, dtype=np.int64)
+        # the budget history holds the budget before every round, like `Dealer.play`
+        budgets = np.concatenate(([0], np.cumsum(nets)))
+        history = budgets[:-1][::record_every]
+
+        result = SimulationResult(
+            ["Optimal Player"], [wins], [draws], [losses], budgets[-1:],
+            history[None, :], np.arange(0, n_rounds, record_every, dtype=np.int64))
+        result.rounds = n_rounds
+        return result
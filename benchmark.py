@@ -0,0 +1,410 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from counting import RunningCounts
+from dealer import Dealer
+from deck import Deck, Hand, score
+from player import Optimal_Player, make_player
+from strategy import BASIC_STRATEGY, CHART_DIR, Strategy
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# key of the baseline that describes the machine it was measured on
+ENVIRONMENT = "_environment"
+COUNTERS = "3456789"
+# Seconds every benchmark is repeated for at least
+MIN_TIME = 2.0
+# Steps of the reference loop, about 20 ms
+REFERENCE = 50_000
+
+
+class Benchmark:
+    """
+    A piece of code to be timed.
+
+    `setup` creates the state passed to `run`, which returns how many units
+    (cards, decisions, rounds, ...) it processed.
+    """
+
+    def __init__(self, name: str, unit: str, setup, run, repeat: int = 3) -> None:
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.run = run
+        self.repeat = repeat
+
+    def measure(self, memory: bool = False, min_time: float = MIN_TIME) -> dict:
+        """
+        Runs the benchmark at least `repeat` times and for at least `min_time` seconds,
+        and returns the best throughput.
+
+        The speed of a shared machine drifts by tens of percents within seconds, so every run is also
+        divided by the speed of a reference loop timed right before and after it.
+        The median of these `relative` throughputs is what `check` compares.
+        """
+        best = 0.0
+        seconds = 0.0
+        runs = 0
+        total = 0.0
+        relative = []
+        while runs < self.repeat or total < min_time:
+            runs += 1
+            state = self.setup()
+            reference = _reference()
+            start = time.process_time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                units = self.run(state)
+            elapsed = time.process_time() - start
+            total += elapsed
+            relative.append(units / elapsed / ((reference + _reference()) / 2))
+            if units / elapsed > best:
+                best = units / elapsed
+                seconds = elapsed
+
+        result = {"per_second": best, "seconds": seconds, "runs": runs, "unit": self.unit,
+                  "relative": float(np.median(relative))}
+        if memory:
+            # tracing slows the code down, so the peak memory is measured in a separate run
+            state = self.setup()
+            tracemalloc.start()
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.run(state)
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        return result
+
+
+class _Yardstick:
+    """Method calls, properties and NumPy item lookups, what the hot paths of the simulation are made of"""
+
+    def __init__(self) -> None:
+        self.values = np.arange(64)
+        self.top = 0
+
+    @property
+    def value(self) -> int:
+        return self.values.item(self.top & 63)
+
+    def step(self, top: int) -> int:
+        self.top = top
+        return self.value
+
+
+def _reference() -> float:
+    """Steps per second of a `_Yardstick`, a measure of the machine's current speed"""
+    yardstick = _Yardstick()
+    start = time.process_time()
+    for i in range(REFERENCE):
+        yardstick.step(i)
+    return REFERENCE / (time.process_time() - start)
+
+
+def _seeded_deck() -> Deck:
+    deck = Deck(6, 0.75, np.random.default_rng(0))
+    deck.shuffle()
+    return deck
+
+
+def _shuffle(deck: Deck) -> int:
+    for _ in range(10000):
+        deck.shuffle()
+    return 10000
+
+
+def _pick(deck: Deck) -> int:
+    picked = 0
+    for _ in range(5000):
+        deck.top = 0
+        for _ in range(300):
+            deck.pick()
+        picked += 300
+    return picked
+
+
+def _random_hands(n: int):
+    deck = _seeded_deck()
+    hands = []
+    for _ in range(n):
+        if deck.top > 300:
+            deck.shuffle()
+        hand = Hand((deck.pick(), deck.pick()))
+        while hand.total < 12:
+            hand.append(deck.pick())
+        hands.append((hand, deck.pick()))
+    return hands
+
+
+def _score(hands) -> int:
+    for _ in range(20):
+        for hand, _ in hands:
+            score(hand.cards)
+    return 20 * len(hands)
+
+
+def _hand(hands) -> int:
+    for _ in range(5):
+        for hand, _ in hands:
+            Hand(hand.cards)
+    return 5 * len(hands)
+
+
+def _decide(state) -> int:
+    player, hands = state
+    for _ in range(20):
+        for hand, upcard in hands:
+            player.decide(hand, upcard)
+    return 20 * len(hands)
+
+
+def _count_setup():
+    deck = _seeded_deck()
+    counts = RunningCounts()
+    counters = [make_player(strategy) for strategy in COUNTERS]
+    for counter in counters:
+        counter.attach(counts, deck)
+    return deck, counts, counters
+
+
+def _recount(state) -> int:
+    deck, counts, _ = state
+    for _ in range(5000):
+        counts.reset(deck.cards)
+    return 5000 * len(deck.cards)
+
+
+def _count_bet(state) -> int:
+    deck, counts, counters = state
+    counts.reset(deck.cards)
+    for _ in range(50):
+        for top in range(0, 234):
+            deck.top = top
+            for counter in counters:
+                counter.bet()
+    return 50 * 234 * len(counters)
+
+
+def _table(strategies: str, rounds: int):
+    def setup():
+        players = [make_player(strategy, np.random.default_rng(i)) for i, strategy in enumerate(strategies)]
+        return Dealer(_seeded_deck(), players), rounds
+
+    return setup
+
+
+def _play(state) -> int:
+    dealer, rounds = state
+    dealer.play(rounds, verbose=False)
+    return rounds
+
+
+def _simulate(rounds: int):
+    def run(_) -> int:
+        import matplotlib.pyplot as plt
+        from blackjack import simulate
+
+        players = [make_player(strategy) for strategy in "0123456789"]
+        simulate(players, rounds, "benchmark.png", seed=0)
+        plt.close("all")
+        os.remove(os.path.join("plots", "benchmark.png"))
+        return rounds
+
+    return run
+
+
+def benchmarks(quick: bool = False):
+    """All benchmarks, with `quick` the long end-to-end simulations are left out"""
+    suite = [
+        Benchmark("Deck.shuffle", "shuffles", _seeded_deck, _shuffle),
+        Benchmark("Deck.pick", "cards", _seeded_deck, _pick),
+        Benchmark("score", "hands", lambda: _random_hands(20000), _score),
+        Benchmark("Hand.append", "hands", lambda: _random_hands(20000), _hand),
+        Benchmark("Optimal_Player.decide", "decisions",
+                  lambda: (Optimal_Player(0), _random_hands(20000)), _decide),
+        Benchmark("RunningCounts.reset (7 counters)", "cards", _count_setup, _recount),
+        Benchmark("Card_Counter.bet (7 counters)", "bets", _count_setup, _count_bet),
+        Benchmark("Dealer.play_round (1 player)", "rounds", _table("2", 20000), _play),
+        Benchmark("Dealer.play_round (5 players)", "rounds", _table("23456", 10000), _play),
+        Benchmark("Dealer.play_round (10 players)", "rounds", _table("0123456789", 5000), _play),
+        Benchmark("simulate (10k rounds)", "rounds", lambda: None, _simulate(10_000), repeat=1),
+        Benchmark("simulate (100k rounds)", "rounds", lambda: None, _simulate(100_000), repeat=1),
+        Benchmark("simulate (1M rounds)", "rounds", lambda: None, _simulate(1_000_000), repeat=1),
+    ]
+    if quick:
+        suite = [b for b in suite if b.name != "simulate (1M rounds)"]
+    return suite
+
+
+def verify_batch(strategy=BASIC_STRATEGY, lanes: int = 200, seed: int = 0) -> int:
+    """
+    Plays the first shoe of every lane of a `BatchEngine` again at a `Dealer` with one `Optimal_Player`
+    and raises a ValueError if any round ends differently. Returns the number of rounds compared.
+    """
+    from batch import BatchEngine
+    from deck import VALUE_TABLE
+
+    engine = BatchEngine(lanes, strategy=strategy, rng=np.random.default_rng(seed))
+    shoes = engine.values.copy()
+    nets = []
+    # number of rounds every lane played before shuffling
+    rounds = np.zeros(lanes, dtype=np.int64)
+    first_shoe = np.ones(lanes, dtype=bool)
+    while True:
+        # a lane past its shuffle point shuffles at the start of the next round
+        first_shoe &= engine.top <= engine.stop_card_index
+        if not first_shoe.any():
+            break
+        rounds += first_shoe
+        nets.append(engine.play_round()[0])
+
+    # the engine only knows the values of the cards, any card of the same value will do
+    codes = np.zeros(12, dtype=np.uint8)
+    for value in range(2, 12):
+        codes[value] = np.flatnonzero(VALUE_TABLE == value)[0]
+
+    compared = 0
+    for lane in range(lanes):
+        player = Optimal_Player(0, strategy)
+        dealer = Dealer(Deck(6, 0.75, shoes=iter([codes[shoes[lane]]])), [player], record_every=0,
+                        double_after_split=strategy.double_after_split)
+        for round_number in range(rounds[lane]):
+            budget = player.budget
+            dealer.play_round()
+            if player.budget - budget != nets[round_number][lane]:
+                raise ValueError(f"Round {round_number} of lane {lane} ends differently at a Dealer")
+            compared += 1
+    return compared
+
+
+def verify_resume(rounds: int = 20000, seed: int = 0) -> int:
+    """
+    Plays a table with every strategy once without interruption, and once stopped after a checkpoint
+    halfway and resumed from it. Raises a ValueError if the budgets, the totals or the budget
+    history differ. Returns the number of rounds compared.
+    """
+    from checkpoint import resume, save_checkpoint
+
+    def table():
+        players = [make_player(strategy, np.random.default_rng(i)) for i, strategy in enumerate("0123456789")]
+        return Dealer(_seeded_deck(), players, record_every=3)
+
+    expected = table()
+    history = expected.play(rounds, verbose=False).copy()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "verify.ckpt")
+        dealer = table()
+        dealer.play(rounds // 2, verbose=False)
+        save_checkpoint(dealer, path, rounds - rounds // 2, verbose=False)
+        # rounds played after the last checkpoint are lost when the process dies
+        dealer.play(rounds // 10, verbose=False)
+        resumed, resumed_history = resume(path)
+
+    for name in ("wins", "draws", "losses"):
+        if getattr(resumed, name) != getattr(expected, name):
+            raise ValueError(f"The resumed simulation has different {name}")
+    if [p.budget for p in resumed.players] != [p.budget for p in expected.players]:
+        raise ValueError("The resumed simulation has different budgets")
+    if not np.array_equal(resumed_history, history):
+        raise ValueError("The resumed simulation has a different budget history")
+    return rounds
+
+
+def environment() -> dict:
+    """The machine, Python and NumPy the benchmarks run on, throughput is only comparable on the same"""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "system": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns the names of the benchmarks that are more than `tolerance` slower than the baseline"""
+    slower = []
+    for name, result in results.items():
+        if name in baseline and _change(result, baseline[name]) < -tolerance:
+            slower.append(name)
+    return slower
+
+
+def _change(result: dict, baseline: dict) -> float:
+    """Relative change of the throughput, compared to the reference loop if both have been"""
+    key = "relative" if "relative" in baseline else "per_second"
+    return result[key] / baseline[key] - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of the simulation.")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M round simulation")
+    parser.add_argument("--memory", action="store_true", help="also measure the peak memory")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="fail if slower than the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before --check fails (default 0.25)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help=f"seconds to repeat every benchmark for, the best run counts (default {MIN_TIME})")
+    parser.add_argument("--verify", action="store_true",
+                        help="check that the fast paths give the same results as a plain Dealer, then exit")
+    args = parser.parse_args()
+
+    if args.verify:
+        for chart in ("basic_strategy.json", "basic_strategy_no_das.json"):
+            strategy = Strategy.load(os.path.join(CHART_DIR, chart))
+            print(f"BatchEngine matches Dealer with {chart} in {verify_batch(strategy)} rounds")
+        print(f"Resumed checkpoint matches an uninterrupted simulation of {verify_resume()} rounds")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    recorded = baseline.get(ENVIRONMENT)
+    if recorded is not None and recorded != environment():
+        print(f"The baseline was measured on a different setup: {recorded}")
+
+    results = {}
+    print(f"{'benchmark':<36} {'per second':>14} {'unit':<10} {'seconds':>8} {'peak MB':>8} {'baseline':>9}")
+    for benchmark in benchmarks(args.quick):
+        if args.filter not in benchmark.name:
+            continue
+        result = benchmark.measure(args.memory, args.min_time)
+        results[benchmark.name] = result
+
+        peak = f"{result['peak_mb']:8.1f}" if "peak_mb" in result else f"{'-':>8}"
+        change = f"{'-':>9}"
+        if benchmark.name in baseline:
+            change = f"{_change(result, baseline[benchmark.name]):+9.0%}"
+        print(f"{benchmark.name:<36} {result['per_second']:14,.0f} {result['unit']:<10} "
+              f"{result['seconds']:8.3f} {peak} {change}")
+
+    if args.save:
+        baseline.update(results)
+        baseline[ENVIRONMENT] = environment()
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.check:
+        slower = check(results, baseline, args.tolerance)
+        if slower:
+            print("Slower than the baseline: " + ", ".join(slower))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
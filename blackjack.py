@@ -1,9 +1,21 @@
+import argparse
+import csv
+import json
+import os
 import re
-import matplotlib.pyplot as plt
+import sys
 
-from dealer import *
-from deck import *
-from player import *
+import numpy as np
+
+from dealer import Dealer
+from deck import Deck
+from player import CLI_Player, make_player
+from plotting import label, plot_budgets
+from results import DiskHistory
+from shoes import ShoePool
+
+# output formats of the command line
+FORMATS = ("plot", "csv", "json", "none")
 
 
 def play_alone():
@@ -14,24 +26,111 @@ def play_alone():
     dealer.play(10000)
 
 
-def simulate(players, rounds, output_file):
-    """Starts simulation with chosen strategies and plots the results."""
-    deck = Deck(6, 0.75)
-    dealer = Dealer(deck, players)
+def simulate(players, rounds, output_file, record_every=1, results=None, seed=None):
+    """Starts simulation with chosen strategies and plots the results.
 
-    statistics = dealer.play(rounds)
+    Only every `record_every`-th round is recorded, which keeps the memory
+    footprint of very long simulations small. With `results` the history is
+    written to that directory instead of kept in memory, see results.py.
 
-    for i, player_budget in enumerate(statistics):
-        plt.plot(player_budget, marker='', linestyle='-',
-                 label=f'{players[i].name}')
+    The deck and every player get their own random stream derived from `seed`,
+    so a simulation with the same seed and players is played exactly the same.
+    """
+    if record_every < 1:
+        # without a budget history there would be nothing to plot
+        raise ValueError("record_every must be at least 1")
 
-    plt.xlabel('Rounds Played')
-    plt.ylabel('Player Budget')
-    plt.title('Player Budget over Rounds')
-    plt.legend()
-    plt.grid(True)
+    streams = np.random.SeedSequence(seed).spawn(len(players) + 1)
+    deck = Deck(6, 0.75, shoes=ShoePool(6, np.random.default_rng(streams[0])))
+    for player, stream in zip(players, streams[1:]):
+        player.seed(np.random.default_rng(stream))
+    history = None
+    if results is not None:
+        history = DiskHistory(results, [player.name for player in players], record_every)
+    dealer = Dealer(deck, players, record_every, history=history)
+
+    statistics = dealer.play(rounds)
+    # the history is sampled every `record_every` rounds, the plot derives the rounds from that
+    plot(record_every, statistics, [player.name for player in players], "plots/" + output_file)
+
+
+def plot(x, histories, names, path: str) -> None:
+    """
+    Plots the budget histories and saves the plot to `path`,
+    `x` are the rounds of the samples or the number of rounds between two samples
+    """
+    # matplotlib takes longer to import than most simulations take, so it's only imported when needed
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    plot_budgets(ax, x, histories, names)
+    label(ax)
+
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def summary(result) -> list:
+    """One row per player with the totals of a `parallel.SimulationResult`"""
+    return [{"name": name, "rounds": result.rounds, "wins": int(result.wins[i]), "draws": int(result.draws[i]),
+             "losses": int(result.losses[i]), "budget": int(result.budgets[i])}
+            for i, name in enumerate(result.names)]
+
+
+def run(argv) -> None:
+    """Runs a simulation described by command line arguments, without asking anything"""
+    parser = argparse.ArgumentParser(description="Simulates blackjack strategies.")
+    parser.add_argument("strategies", nargs="+", choices=[str(i) for i in range(10)], metavar="strategy",
+                        help="numbers of the strategies as in the interactive menu, e.g. 2 3 4")
+    parser.add_argument("-r", "--rounds", type=int, default=100_000, help="rounds to play (default 100000)")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed of the random generators")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="processes to play the shards in (default 1)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="independent tables to split the rounds over, the result depends on it "
+                             "but not on the number of workers (default 16)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="plot",
+                        help="plot the budgets, or write the totals as csv or json (default plot)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="output file, relative plots are saved in plots/, csv and json are printed without it")
+    parser.add_argument("--decks", type=int, default=6, help="number of decks in the shoe (default 6)")
+    parser.add_argument("--shuffle-point", type=float, default=0.75,
+                        help="fraction of the shoe played before shuffling (default 0.75)")
+    parser.add_argument("--record-every", type=int, default=None,
+                        help="only record the budgets of every n-th round of the plot")
+    args = parser.parse_args(argv)
+
+    # only plots need the budget history, keep about 100k points of it
+    record_every = 0
+    if args.format == "plot":
+        record_every = args.record_every or max(1, args.rounds // 100_000)
+
+    from parallel import simulate_parallel
+    result = simulate_parallel(args.strategies, args.rounds, args.seed, args.shards, args.workers,
+                               number_of_decks=args.decks, shuffle_point=args.shuffle_point,
+                               record_every=record_every)
+    rows = summary(result)
+
+    if args.format == "plot":
+        output = args.output or f"{args.rounds}_{''.join(args.strategies)}.png"
+        plot(result.round_numbers, result.budget_history, result.names, os.path.join("plots", output))
+    elif args.format in ("csv", "json"):
+        f = sys.stdout if args.output is None else open(args.output, "w", newline="")
+        if args.format == "csv":
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=4)
+            f.write("\n")
+        if f is not sys.stdout:
+            f.close()
 
-    plt.savefig("plots/" + output_file)
+    # the totals are always shown, unless the table was already printed
+    if args.format in ("plot", "none") or args.output is not None:
+        for row in rows:
+            print(f"Total for player {row['name']}: {row['wins']}/{row['draws']}/{row['losses']}, "
+                  f"budget {row['budget']}")
 
 
 def main():
@@ -74,18 +173,7 @@ def main():
         strategies = strat_list.split()
         players = []
         for strat in strategies:
-            match strat:
-                case "0": players.append(RandomPlayer(0))
-                case "1": players.append(AveragePlayer(0))
-                case "2": players.append(Optimal_Player(0))
-                case "3": players.append(Card_Counter("Hi-Lo", 0, 6, STRAT_HI_LO))
-                case "4": players.append(Card_Counter("Hi-Opt I", 0, 6, STRAT_HI_OPTI))
-                case "5": players.append(Card_Counter("Hi-Opt II", 0, 6, STRAT_HI_OPTII))
-                case "6": players.append(Card_Counter("KO", 0, 6, STRAT_KO))
-                case "7": players.append(Card_Counter("Omega II", 0, 6, STRAT_OMEGAII))
-                case "8": players.append(Card_Counter("Zen Count", 0, 6, STRAT_ZEN_COUNT))
-                case "9": players.append(Card_Counter("10 Count", 0, 6, STRAT_10_COUNT))
-                case _: print("Invalid choice. Please try again.")
+            players.append(make_player(strat))
 
         rounds = 0
         while True:
@@ -102,4 +190,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1:
+        run(sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,118 @@
+import os
+import pickle
+import weakref
+
+import numpy as np
+
+from history import BudgetHistory
+
+# Increased whenever the layout of the checkpoint changes
+VERSION = 3
+# Budget histories are appended to this file next to the checkpoint instead of being pickled
+SIDECAR = ".history"
+DTYPE = np.dtype("<i8")
+
+# sidecar file and number of samples already written to it, for every history that was checkpointed
+_written = weakref.WeakKeyDictionary()
+
+
+def _append_history(history: BudgetHistory, path: str) -> None:
+    """Appends the samples recorded since the last checkpoint to the sidecar file, one row per sample"""
+    written = _written.get(history)
+    start = written[1] if written is not None and written[0] == path else 0
+    with open(path, "ab" if start else "wb") as f:
+        f.write(np.ascontiguousarray(history.view()[:, start:].T, dtype=DTYPE).tobytes())
+    _written[history] = (path, history.length)
+
+
+def _load_history(path: str, state: dict) -> BudgetHistory:
+    """Reads the samples of a history from the sidecar file, dropping any written after the checkpoint"""
+    n_players, length = state["n_players"], state["length"]
+    history = BudgetHistory(n_players, capacity=length, every=state["every"])
+    samples = np.fromfile(path, dtype=DTYPE, count=length * n_players)
+    if len(samples) != length * n_players:
+        raise ValueError(f"{path} has fewer budgets than the checkpoint recorded")
+    history.buffer[:, :length] = samples.reshape(length, n_players).T
+    history.length = length
+    history.rounds = state["rounds"]
+
+    with open(path, "r+b") as f:
+        f.truncate(length * n_players * DTYPE.itemsize)
+    _written[history] = (path, length)
+    return history
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, sidecar: str) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.sidecar = sidecar
+
+    def persistent_id(self, obj):
+        if type(obj) is not BudgetHistory:
+            return None
+        _append_history(obj, self.sidecar)
+        return ("history", {"n_players": obj.buffer.shape[0], "length": obj.length,
+                            "every": obj.every, "rounds": obj.rounds})
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, sidecar: str) -> None:
+        super().__init__(file)
+        self.sidecar = sidecar
+
+    def persistent_load(self, pid):
+        kind, state = pid
+        if kind != "history":
+            raise pickle.UnpicklingError(f"Unknown object {kind} in checkpoint")
+        return _load_history(self.sidecar, state)
+
+
+def save_checkpoint(dealer, path: str, remaining: int, verbose: bool = True) -> None:
+    """
+    Writes the full state of a simulation to `path`: the deck, the players
+    and their generators, budgets, counters and statistics,
+    together with the number of rounds that are still to be played.
+
+    The budget history would make every checkpoint larger than the previous one, so only
+    the samples recorded since the last checkpoint are appended to `path + ".history"`
+    and the checkpoint keeps the number of samples.
+
+    The file is replaced atomically, so a crash while writing leaves the previous checkpoint intact.
+    """
+    state = {
+        "version": VERSION,
+        "dealer": dealer,
+        "remaining": remaining,
+        "verbose": verbose,
+    }
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        _Pickler(f, path + SIDECAR).dump(state)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """Reads a checkpoint written by `save_checkpoint`"""
+    with open(path, "rb") as f:
+        state = _Unpickler(f, path + SIDECAR).load()
+
+    if state.get("version") != VERSION:
+        raise ValueError(f"Checkpoint {path} has an unsupported version {state.get('version')}")
+
+    return state
+
+
+def resume(path: str, checkpoint_every: float = 5.0):
+    """
+    Continues a simulation from a checkpoint written by `Dealer.play`,
+    playing exactly the rounds that were left. The result is identical to
+    a simulation that was never interrupted.
+
+    Returns the dealer, whose statistics cover the whole simulation,
+    and the budget history like `Dealer.play`.
+    """
+    state = load_checkpoint(path)
+    dealer = state["dealer"]
+    history = dealer.play(state["remaining"], state["verbose"], path, checkpoint_every)
+    return dealer, history
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dealer import Dealer
+from deck import Deck
+from player import make_player
+from shoes import ShoePool
+
+
+def replay(strategy: str, shoes: int, seed: int, number_of_decks: int = 6, shuffle_point: float = 0.75):
+    """
+    Plays `shoes` shoes with a single player of `strategy` alone at the table.
+    The shoes only depend on `seed`, so every strategy replayed with it sees the same cards.
+
+    Returns the winnings and the number of rounds of every shoe.
+    """
+    shoe_seed, player_seed = np.random.SeedSequence(seed).spawn(2)
+    pool = ShoePool(number_of_decks, np.random.default_rng(shoe_seed), background=True)
+    deck = Deck(number_of_decks, shuffle_point, shoes=pool)
+    player = make_player(strategy, np.random.default_rng(player_seed), number_of_decks)
+    dealer = Dealer(deck, [player], record_every=0)
+
+    winnings = np.zeros(shoes, dtype=np.int64)
+    rounds = np.zeros(shoes, dtype=np.int64)
+    for i in range(shoes):
+        budget = player.budget
+        rounds[i] = dealer.play_shoe()
+        winnings[i] = player.budget - budget
+
+    pool.close()
+    return winnings, rounds
+
+
+class Comparison:
+    """
+    Winnings of several strategies that played the same shoes (common random numbers).
+
+    Since every strategy saw the same cards, the luck of a shoe mostly cancels out
+    in the difference between two strategies, which therefore has a much smaller
+    variance than the difference of two independent simulations.
+    """
+
+    def __init__(self, names, winnings, rounds) -> None:
+        self.names = list(names)
+        # (strategies, shoes) winnings and rounds played per shoe
+        self.winnings = np.asarray(winnings)
+        self.rounds = np.asarray(rounds)
+
+    @property
+    def shoes(self) -> int:
+        return self.winnings.shape[1]
+
+    def _index(self, strategy) -> int:
+        return self.names.index(strategy) if isinstance(strategy, str) else strategy
+
+    def ev(self, strategy):
+        """Average winnings per round of a strategy and its standard error"""
+        i = self._index(strategy)
+        rounds = self.rounds[i].sum()
+        ev = self.winnings[i].sum() / rounds
+        # ratio estimator, the number of rounds per shoe varies
+        residuals = self.winnings[i] - ev * self.rounds[i]
+        error = np.sqrt(self.shoes / (self.shoes - 1) * np.sum(residuals ** 2)) / rounds
+        return ev, error
+
+    def difference(self, a, b):
+        """
+        Average difference in winnings per shoe between strategies `a` and `b`,
+        its standard error from the paired differences and the standard error
+        two independent simulations of the same length would have had
+        """
+        a, b = self._index(a), self._index(b)
+        differences = self.winnings[a] - self.winnings[b]
+        paired = differences.std(ddof=1) / np.sqrt(self.shoes)
+        independent = np.sqrt((self.winnings[a].var(ddof=1) + self.winnings[b].var(ddof=1)) / self.shoes)
+        return differences.mean(), paired, independent
+
+    def report(self) -> str:
+        lines = [f"{'strategy':<16} {'rounds':>10} {'EV/round':>10} {'+-':>8}"]
+        for i, name in enumerate(self.names):
+            ev, error = self.ev(i)
+            lines.append(f"{name:<16} {self.rounds[i].sum():10d} {ev:10.3f} {error:8.3f}")
+
+        lines.append("")
+        lines.append(f"{'difference per shoe':<36} {'mean':>10} {'+- paired':>10} {'+- indep.':>10}")
+        for a in range(len(self.names)):
+            for b in range(a + 1, len(self.names)):
+                mean, paired, independent = self.difference(a, b)
+                pair = f"{self.names[a]} - {self.names[b]}"
+                lines.append(f"{pair:<36} {mean:10.2f} {paired:10.2f} {independent:10.2f}")
+        return "\n".join(lines)
+
+
+def compare(strategies, shoes: int, seed: int = None, workers: int = None, number_of_decks: int = 6,
+            shuffle_point: float = 0.75) -> Comparison:
+    """
+    Plays every strategy (numbers of the simulation menu) alone through the same `shoes` shuffled shoes,
+    one strategy per process.
+    """
+    strategies = list(strategies)
+    seeds = [np.random.SeedSequence(seed).entropy] * len(strategies)
+    workers = min(os.cpu_count() if workers is None else workers, len(strategies))
+
+    if workers <= 1:
+        results = [replay(s, shoes, sd, number_of_decks, shuffle_point) for s, sd in zip(strategies, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(replay, strategies, [shoes] * len(strategies), seeds,
+                                    [number_of_decks] * len(strategies), [shuffle_point] * len(strategies)))
+
+    names = [make_player(s).name for s in strategies]
+    return Comparison(names, [w for w, _ in results], [r for _, r in results])
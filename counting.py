@@ -0,0 +1,37 @@
+import numpy as np
+
+from deck import VALUE_TABLE
+
+
+class RunningCounts:
+    """
+    Running counts of several card counting strategies for an entire shoe.
+
+    When the shoe is shuffled, the counts of all strategies are computed at once
+    as a cumulative sum over the shoe. The count after the first `n` cards
+    were dealt is then a single lookup, no matter how many counters sit at the table.
+    """
+
+    def __init__(self) -> None:
+        self.strats = []
+        self.counts = np.zeros((0, 1), dtype=np.int32)
+
+    def add(self, strat) -> int:
+        """Registers a counting strategy and returns the row its counts are stored in"""
+        strat = list(strat)
+        if strat not in self.strats:
+            self.strats.append(strat)
+        return self.strats.index(strat)
+
+    def reset(self, cards: np.ndarray) -> None:
+        """Computes the running counts of all strategies for a freshly shuffled shoe"""
+        if not self.strats:
+            return
+
+        table = np.array(self.strats, dtype=np.int32)
+        self.counts = np.zeros((len(self.strats), len(cards) + 1), dtype=np.int32)
+        np.cumsum(table[:, VALUE_TABLE[cards]], axis=1, out=self.counts[:, 1:])
+
+    def count(self, row: int, position: int) -> int:
+        """Returns the count of strategy `row` after the first `position` cards were dealt"""
+        return self.counts.item(row, position)
@@ -1,7 +1,13 @@
+import time
+
 import numpy as np
 
-from deck import *
-from player import *
+from checkpoint import save_checkpoint
+from counting import RunningCounts
+from deck import VALUES, Deck, Hand
+from history import BudgetHistory
+from player import Player
+from strategy import Action
 
 
 class Dealer:
@@ -11,27 +17,68 @@ class Dealer:
     It calls all specific methods from the players during play.
     """
 
-    def __init__(self, deck: Deck, players) -> None:
+    def __init__(self, deck: Deck, players, record_every: int = 1, stats=(), instrument=None,
+                 history=None, log=None, double_after_split: bool = True) -> None:
         self.deck = deck
         self.players = players
+        # table rule, without it a player that doubles down on a split hand gets a hit instead
+        self.double_after_split = double_after_split
+        # players that want to see the cards delt in every round
+        self.observers = [player for player in players if player.observes_cards]
+        # online statistics that are fed after every round, see stats.py
+        self.stats = list(stats)
+
+        # running counts of all card counting strategies at the table
+        self.counts = RunningCounts()
+        for player in players:
+            player.attach(self.counts, deck)
 
         self.deck.shuffle()
-        self.budget_history = [np.array([]) for player in players]
+        self.counts.reset(self.deck.cards)
+        # only every `record_every`-th round is kept in the budget history,
+        # with 0 no history is kept at all. A `history` given explicitly, like a
+        # `DiskHistory` from results.py, is used instead
+        self.budget_history = history
+        if history is None and record_every > 0:
+            self.budget_history = BudgetHistory(len(players), every=record_every)
+        self.rounds_played = 0
         self.wins = [0 for player in players]
         self.losses = [0 for player in players]
         self.draws = [0 for player in players]
 
-    def show_to_others(self, card: Card, player: Player) -> None:
-        """Shows a card do all players except `player`"""
-        for other in self.players:
-            if other is not player:
-                other.see_card(card)
+        # optional profiling, see instrument.py
+        self.instrument = instrument
+        if instrument is not None:
+            instrument.attach(self)
+
+        # optional hand history, see handlog.py
+        self.log = log
+        if log is not None:
+            log.attach(self)
 
-    def deal(self, to: Player) -> Card:
-        """Picks a card from the deck, show it to everyone except `player` and returns it"""
-        card = self.deck.pick()
-        self.show_to_others(card, to)
-        return card
+    def __setstate__(self, state: dict) -> None:
+        # the timers of the instrumentation are pickled as the methods they wrapped, time them again
+        self.__dict__.update(state)
+        if self.instrument is not None:
+            self.instrument.attach(self)
+
+    def shuffle(self) -> None:
+        """Shuffles the deck, recomputes the running counts and informs the players"""
+        self.deck.shuffle()
+        self.counts.reset(self.deck.cards)
+        for p in self.players:
+            p.on_shuffle()
+
+    def deal(self) -> int:
+        """Picks a card from the deck and returns it"""
+        return self.deck.pick()
+
+    def reveal(self, start: int) -> None:
+        """Shows all cards delt since shoe position `start` to the players that observe cards"""
+        if self.observers:
+            cards = self.deck.cards[start:self.deck.top]
+            for player in self.observers:
+                player.see_cards(cards)
 
     def play_with(self, player: Player, bet: int):
         """
@@ -46,15 +93,17 @@ class Dealer:
 
         # Deal the initial 2 card hand
         potential_winnings = [bet * 2]
-        hands = [[self.deal(player), self.deal(player)]]
+        hands = [Hand((self.deal(), self.deal()))]
 
         # Iterate through each hand yet to be delt with
         i = 0
         while i < len(hands):
+            hand = hands[i]
+
             # Hand is bust or 21
-            if score(hands[i]) >= 21:
+            if hand.total >= 21:
                 # Is hand a blackjack?
-                if score(hands[i]) == 21 and i == 0 and len(hands) == 1 and len(hands[0]) == 2:
+                if hand.total == 21 and i == 0 and len(hands) == 1 and hand.size == 2:
                     potential_winnings[i] = int(1.5 * potential_winnings[i])
 
                 # move on to the next hand
@@ -62,35 +111,40 @@ class Dealer:
                 continue
 
             # Ask player for their strategy
-            decision = player.decide(hands[i], self.dealer_cards[0])
+            decision = player.decide(hand, self.dealer_cards.cards[0])
             match decision:
                 case Action.HIT:
                     # simply add another card to the current hand
-                    hands[i].append(self.deal(player))
+                    hand.append(self.deal())
                 case Action.STAND:
                     # Hand is finished, move to the next
                     i += 1
+                case Action.DOUBLE_DOWN if hand.from_split and not self.double_after_split:
+                    # doubling down after a split isn't allowed at this table, hit instead
+                    hand.append(self.deal())
                 case Action.DOUBLE_DOWN:
                     # Add one final card, add bet and move to the next hand
-                    hands[i].append(self.deal(player))
+                    hand.append(self.deal())
                     potential_winnings[i] += bet * 2
                     player.budget -= bet
                     i += 1
                 case Action.SPLIT:
                     # If splitting aces, the next cards delt are the last of the hand.
                     # So just move to the next hand after these
-                    if hands[i][0].value() == 11 and hands[i][0].value() == hands[i][1].value():
-                        hands.insert(i+1, [hands[i].pop()])
-                        hands[i].append(self.deal(player))
-                        hands[i+1].append(self.deal(player))
+                    if hand.pair and VALUES[hand.cards[0]] == 11:
+                        hands.insert(i+1, hand.split())
+                        hand.append(self.deal())
+                        hands[i+1].append(self.deal())
                         potential_winnings.insert(i+1, bet*2)
                         player.budget -= bet
                         i += 2
                     else:
                         # move one card from current hand to a new one
                         # and deal a new to each hand
-                        hands.append([hands[i].pop(), self.deal(player)])
-                        hands[i].append(self.deal(player))
+                        new_hand = hand.split()
+                        new_hand.append(self.deal())
+                        hands.append(new_hand)
+                        hand.append(self.deal())
                         # add bet for the new hand
                         potential_winnings.append(bet*2)
                         player.budget -= bet
@@ -113,51 +167,27 @@ class Dealer:
             return 1
         return 1 if player_score > dealer_score else 0
 
-    def play_round(self):
-        """Plays one round with every player"""
-
-        # add player budgets to the statistics
-        for i, player in enumerate(self.players):
-            self.budget_history[i] = np.append(
-                self.budget_history[i], player.budget)
-
-        # Players place a bet
-        bets = []
-        for player in self.players:
-            bets.append(player.bet())
-            player.budget -= bets[-1]
-
-        # Deal cards to dealer
-        self.dealer_cards = [self.deal(None), self.deck.pick()]
-
-        # Deal for each player
-        hands_and_wins = list()
-        for i, player in enumerate(self.players):
-            hands_and_wins.append(self.play_with(player, bets[i]))
-
-        # Dealer picks cards until reaching 17 or over
-        while score(self.dealer_cards) < 17:
+    def draw_dealer(self) -> None:
+        """Dealer picks cards until reaching 17 or over"""
+        while self.dealer_cards.total < 17:
             self.dealer_cards.append(self.deck.pick())
 
-        # Show the picked cards to all players
-        for i in range(1, len(self.dealer_cards)):
-            self.show_to_others(self.dealer_cards[i], None)
-
-        dealer_score = score(self.dealer_cards)
+    def settle(self, bets, hands_and_wins) -> None:
+        """Determines the winner of every hand and pays out the winnings"""
+        dealer_score = self.dealer_cards.total
+        dealer_blackjack = dealer_score == 21 and self.dealer_cards.size == 2
 
-        # Determine winners
         for i, player in enumerate(self.players):
             if hands_and_wins[i] == None:
                 continue
 
             # collect all winnings from every hand the player
             # played in this round
-            for j in range(len(hands_and_wins[i][0])):
-                player_score = score(hands_and_wins[i][0][j])
+            for j, hand in enumerate(hands_and_wins[i][0]):
+                player_score = hand.total
                 result = self.player_won(player_score, dealer_score)
-                if dealer_score == 21 and len(self.dealer_cards) == 2:
-                    result = 2 if player_score == 21 and len(
-                        hands_and_wins[i][0][j]) == 2 else 0
+                if dealer_blackjack:
+                    result = 2 if player_score == 21 and hand.size == 2 else 0
                 winnings = 0
                 match result:
                     case 0:
@@ -171,23 +201,88 @@ class Dealer:
                         winnings = bets[i]
 
                 # give player their money
-                player.result(
-                    winnings, hands_and_wins[i][0][j], self.dealer_cards)
+                player.result(winnings, hand, self.dealer_cards)
+
+    def play_round(self):
+        """Plays one round with every player"""
+
+        # add player budgets to the statistics
+        budgets = [player.budget for player in self.players]
+        if self.budget_history is not None:
+            self.budget_history.record(budgets)
+        for stat in self.stats:
+            stat.start_round(self)
+
+        # Players place a bet
+        bets = []
+        for player in self.players:
+            bets.append(player.bet())
+            player.budget -= bets[-1]
+        self.bets = bets
+
+        # Deal cards to dealer
+        start = self.deck.top
+        self.dealer_cards = Hand((self.deal(), self.deal()))
+
+        # Deal for each player
+        hands_and_wins = list()
+        for i, player in enumerate(self.players):
+            hands_and_wins.append(self.play_with(player, bets[i]))
+
+        self.round_hands = hands_and_wins
+        self.draw_dealer()
+        self.reveal(start)
+        self.settle(bets, hands_and_wins)
+
+        self.rounds_played += 1
+
+        if self.stats:
+            after = np.array([player.budget for player in self.players], dtype=np.int64)
+            nets = after - budgets
+            for stat in self.stats:
+                stat.end_round(self, after, nets)
+
+    def play_shoe(self) -> int:
+        """Plays all rounds until the cut card of the current shoe, shuffles and returns the number of rounds"""
+        rounds = 0
+        while rounds == 0 or not self.deck.should_shuffle():
+            self.play_round()
+            rounds += 1
+        self.shuffle()
+        return rounds
+
+    def play(self, n_rounds: int, verbose: bool = True, checkpoint: str = None,
+             checkpoint_every: float = 5.0) -> None:
+        """Simulates `n_rounds` of blackjack and returns the statistics collected
+
+        With `verbose` the progress and the final totals are printed.
+        With `checkpoint` the state of the simulation is written to that file
+        every `checkpoint_every` seconds, see `checkpoint.resume`.
+        """
+        if self.budget_history is not None:
+            self.budget_history.reserve(n_rounds)
+        next_checkpoint = time.monotonic() + checkpoint_every
 
-    def play(self, n_rounds: int) -> None:
-        """Simulates `n_rounds` of blackjack and returns the statistics collected"""
         for i in range(n_rounds):
             if self.deck.should_shuffle():
-                self.deck.shuffle()
-                for p in self.players:
-                    p.on_shuffle()
+                self.shuffle()
 
-            if (i+1) % 1000 == 0:
-                print(f"Round {i+1}")
+            if verbose and (self.rounds_played+1) % 1000 == 0:
+                print(f"Round {self.rounds_played+1}")
 
             self.play_round()
 
-        for i, p in enumerate(self.players):
-            print(
-                f"Total for player {p.name}: {self.wins[i]}/{self.draws[i]}/{self.losses[i]}")
-        return self.budget_history
+            if checkpoint is not None and time.monotonic() >= next_checkpoint:
+                save_checkpoint(self, checkpoint, n_rounds - i - 1, verbose)
+                next_checkpoint = time.monotonic() + checkpoint_every
+
+        if checkpoint is not None:
+            save_checkpoint(self, checkpoint, 0, verbose)
+
+        if verbose:
+            for i, p in enumerate(self.players):
+                print(
+                    f"Total for player {p.name}: {self.wins[i]}/{self.draws[i]}/{self.losses[i]}")
+        if self.budget_history is None:
+            return None
+        return self.budget_history.view()
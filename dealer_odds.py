@@ -0,0 +1,124 @@
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+from deck import VALUE_TABLE, Deck, new_shoe
+
+# Final dealer results, in the order the probabilities are returned
+OUTCOMES = ("17", "18", "19", "20", "21", "bust", "blackjack")
+BUST = 5
+BLACKJACK = 6
+
+# A composition counts the cards of every blackjack value 2 to 11 (ace)
+CARD_VALUES = tuple(range(2, 12))
+
+
+def composition(cards) -> tuple:
+    """Counts the cards of every value 2 to 11 in an array of encoded cards"""
+    counts = np.bincount(VALUE_TABLE[np.asarray(cards, dtype=np.uint8)], minlength=12)
+    return tuple(int(n) for n in counts[2:12])
+
+
+def shoe_composition(number_of_decks: int) -> tuple:
+    """Composition of a full shoe of `number_of_decks` decks"""
+    return composition(new_shoe(number_of_decks))
+
+
+def remaining_composition(deck: Deck) -> tuple:
+    """Composition of the cards of `deck` that weren't delt yet"""
+    return composition(deck.cards[deck.top:])
+
+
+def _compress(composition) -> bytes:
+    """Packs a composition into a compact, hashable cache key of uint16 counts"""
+    return np.asarray(composition, dtype=np.uint16).tobytes()
+
+
+@lru_cache(maxsize=None)
+def _draws(upcard: int):
+    """
+    Every way the dealer can finish a hand after showing `upcard`, grouped by the cards drawn.
+
+    Returns the number of cards of every value drawn as a (values, rows) index into a flattened
+    (values, most cards + 1) table and the most cards of one value drawn, the number of cards drawn, the result in `OUTCOMES`
+    and the number of orders the cards can be drawn in that end with it.
+    The probability of drawing cards in a given order doesn't depend on the order,
+    so these don't depend on the shoe and are only enumerated once per upcard.
+    """
+    # (cards drawn per value, total, soft aces) of the unfinished hands -> number of orders
+    hands = {((0,) * len(CARD_VALUES), upcard, int(upcard == 11)): 1}
+    finished = defaultdict(int)
+    first = True
+    while hands:
+        drawing = defaultdict(int)
+        for (counts, total, soft), ways in hands.items():
+            for i, value in enumerate(CARD_VALUES):
+                new_counts = counts[:i] + (counts[i] + 1,) + counts[i + 1:]
+                new_total = total + value
+                new_soft = soft + (value == 11)
+                if new_total > 21 and new_soft > 0:
+                    new_total -= 10
+                    new_soft -= 1
+
+                if first and new_total == 21:
+                    finished[(new_counts, BLACKJACK)] += ways
+                elif new_total > 21:
+                    finished[(new_counts, BUST)] += ways
+                elif new_total >= 17:
+                    finished[(new_counts, new_total - 17)] += ways
+                else:
+                    drawing[(new_counts, new_total, new_soft)] += ways
+        hands = drawing
+        first = False
+
+    counts = np.array([counts for counts, _ in finished], dtype=np.intp)
+    outcomes = np.array([outcome for _, outcome in finished], dtype=np.intp)
+    ways = np.array(list(finished.values()), dtype=np.float64)
+    # position of every count in a flattened (values, counts.max() + 1) table
+    # (values, rows), so the product over the values runs along the first axis, which is much faster
+    index = np.ascontiguousarray((counts + np.arange(len(CARD_VALUES)) * (counts.max() + 1)).T)
+    return index, counts.max(), counts.sum(axis=1), outcomes, ways
+
+
+@lru_cache(maxsize=1 << 16)
+def _dealer_probabilities(upcard: int, shoe: bytes) -> tuple:
+    index, most, drawn, outcomes, ways = _draws(upcard)
+    shoe = np.frombuffer(shoe, dtype=np.uint16).astype(np.float64)
+
+    # falling factorials n (n - 1) ... (n - k + 1) of every count n of the shoe for every k,
+    # a factor of 0 zeroes the rest, so drawing more cards than there are has probability 0
+    falling = np.ones((len(shoe), most + 1))
+    np.cumprod(np.maximum(shoe[:, None] - np.arange(most), 0), axis=1, out=falling[:, 1:])
+    orders = np.ones(drawn.max() + 1)
+    np.cumprod(np.maximum(shoe.sum() - np.arange(len(orders) - 1), 0), out=orders[1:])
+
+    probabilities = ways * falling.ravel().take(index).prod(axis=0)
+    orders = orders[drawn]
+    probabilities = np.divide(probabilities, orders, out=np.zeros(len(ways)), where=orders > 0)
+    return tuple(np.bincount(outcomes, probabilities, minlength=len(OUTCOMES)))
+
+
+def dealer_probabilities(upcard: int, composition) -> np.ndarray:
+    """
+    Exact probabilities of every dealer result in `OUTCOMES` for a given upcard value.
+
+    `composition` counts the cards the dealer can still draw, with the upcard already removed.
+    The dealer draws until reaching 17 or more and stands on a soft 17, like `Dealer.play_round`.
+    """
+    return np.array(_dealer_probabilities(upcard, _compress(composition)))
+
+
+def dealer_table(composition) -> np.ndarray:
+    """
+    Probabilities of every dealer result for every upcard value 2 to 11
+    drawn from a shoe of `composition`, as a (10, 7) array.
+    """
+    table = np.zeros((len(CARD_VALUES), len(OUTCOMES)))
+    for i, upcard in enumerate(CARD_VALUES):
+        if composition[i] == 0:
+            continue
+        rest = list(composition)
+        rest[i] -= 1
+        table[i] = dealer_probabilities(upcard, rest)
+    return table
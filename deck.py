@@ -27,87 +27,87 @@ class Suite(Enum):
     S_HEARTS = 0b11_0000
 
 
+# Lookup tables indexed by the encoded card (0bSSVVVV).
+# The tuples are used for single cards, the arrays for whole shoes.
+RANKS = tuple(code & 0b00_1111 for code in range(64))
+VALUES = tuple(11 if rank == 0 else min(rank + 1, 10) for rank in RANKS)
+RANK_TABLE = np.array(RANKS, dtype=np.uint8)
+VALUE_TABLE = np.array(VALUES, dtype=np.uint8)
+
+RANK_NAMES = ("Ace", "2", "3", "4", "5", "6", "7", "8", "9", "10",
+              "Jack", "Queen", "King")
+SUITE_NAMES = ("Spades", "Diamonds", "Clubs", "Hearts")
+
+
 class Card:
     """Represents a card, i.e. both a suite and a value
 
     Card: 0bSSVVVV
     S = Suite
     V = Value
+
+    The deck itself only stores the encoded integers,
+    this class is a thin view used to display them.
     """
 
     def __init__(self, suite: Suite, value: CardValue) -> None:
         self.card = suite.value | value.value
 
+    @staticmethod
+    def of(code: int) -> "Card":
+        """Creates a view of an encoded card"""
+        card = Card.__new__(Card)
+        card.card = int(code)
+        return card
+
     def __repr__(self) -> str:
         """Formats the suite and value to be human readable"""
-        name = ""
-        match (self.card & 0b00_1111):
-            case 0: name = "Ace"
-            case 1: name = "2"
-            case 2: name = "3"
-            case 3: name = "4"
-            case 4: name = "5"
-            case 5: name = "6"
-            case 6: name = "7"
-            case 7: name = "8"
-            case 8: name = "9"
-            case 9: name = "10"
-            case 10: name = "Jack"
-            case 11: name = "Queen"
-            case 12: name = "King"
-
-        name += " of "
-        match (self.card & 0b11_0000):
-            case 0b00_0000: name += "Spades"
-            case 0b01_0000: name += "Diamonds"
-            case 0b10_0000: name += "Clubs"
-            case 0b11_0000: name += "Hearts"
-
-        return name
+        return f"{RANK_NAMES[self.card & 0b00_1111]} of {SUITE_NAMES[self.card >> 4]}"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Card) and self.card == other.card
+
+    def __hash__(self) -> int:
+        return self.card
 
     def value(self) -> int:
         """Maps a card to the number of points it's worth in Blackjack"""
-        match (self.card & 0b00_1111):
-            case 0: return 11
-            case 1: return 2
-            case 2: return 3
-            case 3: return 4
-            case 4: return 5
-            case 5: return 6
-            case 6: return 7
-            case 7: return 8
-            case 8: return 9
-            case 9: return 10
-            case 10: return 10
-            case 11: return 10
-            case 12: return 10
+        return VALUES[self.card]
 
 
-class Deck:
-    """Represents a collection of Cards"""
+def new_shoe(number_of_decks: int) -> np.ndarray:
+    """Returns an unshuffled shoe of `number_of_decks` decks as encoded cards"""
+    deck = [suite.value | val.value for suite in Suite for val in CardValue]
+    return np.tile(np.array(deck, dtype=np.uint8), number_of_decks)
 
-    def __init__(self, number_of_decks: int, shuffle_point: float) -> None:
-        cards = []
-        for i in range(number_of_decks):
-            for suite in Suite:
-                for val in CardValue:
-                    cards.append(Card(suite, val))
 
-        self.cards = np.array(cards)
+class Deck:
+    """Represents a collection of cards, stored as their 0bSSVVVV encoding"""
+
+    def __init__(self, number_of_decks: int, shuffle_point: float, rng: np.random.Generator = None,
+                 shoes=None) -> None:
+        self.cards = new_shoe(number_of_decks)
+        self.rng = np.random.default_rng() if rng is None else rng
+        # an optional iterator of already shuffled shoes that is used instead of shuffling,
+        # e.g. to replay the same shoes for different strategies
+        self.shoes = shoes
         self.top = 0
         self.stop_card_index = int(shuffle_point * len(self.cards))
 
     def __repr__(self) -> str:
-        return str(self.cards)
+        return str([Card.of(card) for card in self.cards])
 
     def shuffle(self) -> None:
-        """Shuffles the entire deck"""
-        np.random.shuffle(self.cards)
+        """Shuffles the entire deck, or takes the next shoe from `shoes`"""
+        if self.shoes is None:
+            self.rng.shuffle(self.cards)
+        else:
+            self.cards = next(self.shoes)
         self.top = 0
 
-    def pick(self) -> Card:
+    def pick(self) -> int:
         """Picks the top card of the deck"""
-        card = self.cards[self.top]
+        card = self.cards.item(self.top)
         self.top += 1
         return card
 
@@ -118,21 +118,85 @@ class Deck:
 
 def score(cards) -> int:
     """
-    Computes the most optimistic score of a list of cards.
+    Computes the most optimistic score of a list of encoded cards.
 
     Optimistic means that if an ace can count as 11 without going over 21, it does.
     """
     result = 0
     ace_count = 0
     for card in cards:
-        result += card.value()
-        if card.value() == 11:
+        value = VALUES[card]
+        result += value
+        if value == 11:
             ace_count += 1
 
         # we are over 21, look if we can make an ace count as 1.
         # if so, subtract 10 from the score to make it count as 1.
-        if result > 21 and ace_count > 0:
+        # An ace added to a soft 21 needs two aces to count as 1, like in `Hand.append`
+        while result > 21 and ace_count > 0:
             result -= 10
             ace_count -= 1
 
     return result
+
+
+class Hand:
+    """
+    A hand of encoded cards that keeps its score up to date as cards are added.
+
+    total     -- the most optimistic score, like `score` computes it
+    soft_aces -- number of aces currently counted as 11
+    pair      -- true if the hand consists of two cards of the same value
+    size      -- number of cards in the hand
+    from_split -- true if the hand is one of the hands of a split pair
+    """
+
+    __slots__ = ("cards", "total", "soft_aces", "pair", "size", "from_split")
+
+    def __init__(self, cards=()) -> None:
+        self.cards = []
+        self.total = 0
+        self.soft_aces = 0
+        self.pair = False
+        self.size = 0
+        self.from_split = False
+        for card in cards:
+            self.append(card)
+
+    def __repr__(self) -> str:
+        return str([Card.of(card) for card in self.cards])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index: int) -> int:
+        return self.cards[index]
+
+    def append(self, card: int) -> None:
+        """Adds a card to the hand and updates the score"""
+        value = VALUES[card]
+        self.cards.append(card)
+        self.size += 1
+        self.total += value
+        if value == 11:
+            self.soft_aces += 1
+
+        # count aces as 1 until we are no longer over 21
+        while self.total > 21 and self.soft_aces > 0:
+            self.total -= 10
+            self.soft_aces -= 1
+
+        self.pair = self.size == 2 and VALUES[self.cards[0]] == value
+
+    def split(self) -> "Hand":
+        """Moves the last card of this hand into a new hand and returns it, both are split hands"""
+        card = self.cards.pop()
+        cards = self.cards
+        self.__init__(cards)
+        self.from_split = True
+        hand = Hand((card,))
+        hand.from_split = True
+        return hand
@@ -0,0 +1,350 @@
+import bisect
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from deck import Deck
+from player import Player
+from stats import Statistic
+from strategy import Action
+
+MAGIC = b"BJHL"
+VERSION = 1
+# file header: magic, version, length of the JSON header
+HEADER = struct.Struct("<4sII")
+# every block starts with the number of its first round, its number of records and its size in the file
+BLOCK = struct.Struct("<qII")
+# written after the index when the log is closed: offset of the index, number of blocks, magic
+FOOTER = struct.Struct("<qI4s")
+# marks an unused slot of the action array
+NO_ACTION = 255
+
+
+def record_dtype(n_players: int, max_cards: int, max_actions: int) -> np.dtype:
+    """Fixed-width layout of one round of a table with `n_players` players"""
+    return np.dtype([
+        ("round", "<i8"),
+        ("shoe", "<i4"),
+        # position in the shoe of the first card of the round and the number of cards delt
+        ("start", "<u2"),
+        ("n_cards", "<u2"),
+        ("cards", "u1", (max_cards,)),
+        ("dealer_total", "u1"),
+        ("bets", "<i8", (n_players,)),
+        # budget after the round minus the budget before it
+        ("nets", "<i8", (n_players,)),
+        ("n_actions", "u1", (n_players,)),
+        ("actions", "u1", (n_players, max_actions)),
+    ])
+
+
+class HandLog(Statistic):
+    """
+    Writes every round played by a `Dealer` to a compact binary file: the cards delt, the dealer total,
+    and the bet, the decisions and the net winnings of every player.
+
+    Rounds are fixed-width records, collected in blocks of `block` rounds that are written at once,
+    compressed with zlib if `compress` is set. An index of the blocks at the end of the file lets
+    `HandLogReader` jump to any round. Pass it to `Dealer(log=...)` and `close` it when done.
+    A dealer with an open log can't be checkpointed.
+    """
+
+    def __init__(self, path: str, block: int = 4096, compress: bool = True, max_cards: int = 96,
+                 max_actions: int = 32) -> None:
+        self.path = path
+        self.block = block
+        self.compress = compress
+        self.max_cards = max_cards
+        self.max_actions = max_actions
+        self.file = None
+        self.index = []
+
+    def attach(self, dealer) -> None:
+        """Starts the log, called by the `Dealer` it is passed to"""
+        self.n_players = len(dealer.players)
+        self.dtype = record_dtype(self.n_players, self.max_cards, self.max_actions)
+        self._clear()
+        self.shoe = 0
+        self.start = dealer.deck.top
+        self.first_round = dealer.rounds_played
+
+        header = json.dumps({
+            "players": [player.name for player in dealer.players],
+            "max_cards": self.max_cards,
+            "max_actions": self.max_actions,
+            "block": self.block,
+            "compress": self.compress,
+            "double_after_split": dealer.double_after_split,
+        }).encode()
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(header)))
+        self.file.write(header)
+
+        for seat, player in enumerate(dealer.players):
+            player.decide = self._logged(player.decide, seat)
+        dealer.stats.append(self)
+
+    def _clear(self) -> None:
+        # the rounds of the current block are collected in plain lists,
+        # which is cheaper per round than filling records. They are converted when the block is written
+        self.rounds = []
+        self.cards = []
+        self.bets = []
+        self.nets = []
+        # seat and action of every decision of the block, and the number of decisions at the end of every round
+        self.decision_seats = []
+        self.decision_actions = []
+        self.decision_ends = []
+
+    def _logged(self, decide, seat: int):
+        log = self
+
+        def logged(hand, dealer_card):
+            action = decide(hand, dealer_card)
+            log.decision_seats.append(seat)
+            log.decision_actions.append(action.value)
+            return action
+
+        return logged
+
+    def start_round(self, dealer) -> None:
+        top = dealer.deck.top
+        # every round uses cards, so if the deck didn't move on it was shuffled
+        if top <= self.start and dealer.rounds_played > self.first_round:
+            self.shoe += 1
+        self.start = top
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        top = dealer.deck.top
+        if top - self.start > self.max_cards:
+            raise ValueError(f"{top - self.start} cards delt in one round, increase max_cards")
+        first = self.decision_ends[-1] if self.decision_ends else 0
+        if len(self.decision_seats) - first > self.max_actions:
+            # only possible if one player made too many decisions, count them per seat
+            seats = np.bincount(self.decision_seats[first:])
+            if seats.max() > self.max_actions:
+                raise ValueError(f"More than {self.max_actions} decisions in one round, increase max_actions")
+
+        self.rounds.append((dealer.rounds_played - 1, self.shoe, self.start, top - self.start,
+                            dealer.dealer_cards.total))
+        self.cards.append(dealer.deck.cards[self.start:top].tobytes())
+        self.bets.append(dealer.bets)
+        self.nets.append(nets)
+        self.decision_ends.append(len(self.decision_seats))
+
+        if len(self.rounds) == self.block:
+            self.flush()
+
+    def _records(self) -> np.ndarray:
+        """Converts the rounds collected for the current block to records"""
+        n = len(self.rounds)
+        records = np.zeros(n, dtype=self.dtype)
+        rounds = np.array(self.rounds, dtype=np.int64)
+        for column, name in enumerate(("round", "shoe", "start", "n_cards", "dealer_total")):
+            records[name] = rounds[:, column]
+
+        # the limits were checked when the rounds ended
+        n_cards = rounds[:, 3]
+        cards = np.frombuffer(b"".join(self.cards), dtype=np.uint8)
+        row = np.repeat(np.arange(n), n_cards)
+        column = np.arange(len(cards)) - np.repeat(np.cumsum(n_cards) - n_cards, n_cards)
+        records["cards"][row, column] = cards
+
+        records["bets"] = np.array(self.bets, dtype=np.int64)
+        records["nets"] = np.array(self.nets, dtype=np.int64)
+
+        # the decisions of a round are made seat after seat, so the decisions of
+        # one player in one round are consecutive
+        actions = np.full((n, self.n_players, self.max_actions), NO_ACTION, dtype=np.uint8)
+        seats = np.array(self.decision_seats, dtype=np.int64)
+        if len(seats):
+            ends = np.array(self.decision_ends, dtype=np.int64)
+            row = np.repeat(np.arange(n), np.diff(ends, prepend=0))
+            key = row * self.n_players + seats
+            first = np.flatnonzero(np.diff(key, prepend=-1))
+            position = np.arange(len(key)) - np.repeat(first, np.diff(first, append=len(key)))
+            actions[row, seats, position] = self.decision_actions
+            records["n_actions"] = np.bincount(key, minlength=n * self.n_players).reshape(n, self.n_players)
+        records["actions"] = actions
+        return records
+
+    def flush(self) -> None:
+        """Writes the rounds collected so far as a block"""
+        if not self.rounds:
+            return
+        records = self._records()
+        data = records.tobytes()
+        if self.compress:
+            data = zlib.compress(data, 1)
+
+        first = int(records[0]["round"])
+        self.index.append((first, self.file.tell()))
+        self.file.write(BLOCK.pack(first, len(records), len(data)))
+        self.file.write(data)
+        self._clear()
+
+    def close(self) -> None:
+        """Writes the remaining rounds and the index of the blocks"""
+        if self.file is None:
+            return
+        self.flush()
+        offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype="<i8").tobytes())
+        self.file.write(FOOTER.pack(offset, len(self.index), MAGIC))
+        self.file.close()
+        self.file = None
+
+    def report(self) -> dict:
+        return {"path": self.path, "blocks": len(self.index)}
+
+
+class ReplayPlayer(Player):
+    """Player that repeats the bet and the decisions of a player from a hand log"""
+
+    observes_cards = False
+
+    def __init__(self, name: str, bet: int, actions) -> None:
+        Player.__init__(self, name, 0)
+        self.last_bet = bet
+        self.actions = list(actions)
+
+    def bet(self) -> int:
+        return self.last_bet
+
+    def decide(self, hand, dealer_card: int) -> Action:
+        return Action(self.actions.pop(0))
+
+    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+        self.budget += winnings
+
+    def on_shuffle(self) -> None:
+        pass
+
+
+class HandLogReader:
+    """Reads a log written by `HandLog`, decompressing only the blocks that are needed"""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        magic, version, length = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a hand log")
+        header = json.loads(self.file.read(length))
+        self.players = header["players"]
+        self.compress = header["compress"]
+        self.double_after_split = header.get("double_after_split", True)
+        self.dtype = record_dtype(len(self.players), header["max_cards"], header["max_actions"])
+        self.blocks_start = self.file.tell()
+        self.index = self._read_index()
+        self.cached = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def _read_index(self):
+        """Reads the index at the end of the file, or rebuilds it if the log wasn't closed"""
+        self.file.seek(0, 2)
+        size = self.file.tell()
+        if size >= self.blocks_start + FOOTER.size:
+            self.file.seek(size - FOOTER.size)
+            offset, blocks, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic == MAGIC:
+                self.file.seek(offset)
+                index = np.frombuffer(self.file.read(16 * blocks), dtype="<i8").reshape(blocks, 2)
+                return [tuple(int(v) for v in entry) for entry in index]
+
+        index = []
+        offset = self.blocks_start
+        while offset + BLOCK.size <= size:
+            self.file.seek(offset)
+            first, count, length = BLOCK.unpack(self.file.read(BLOCK.size))
+            if offset + BLOCK.size + length > size:
+                break
+            index.append((first, offset))
+            offset += BLOCK.size + length
+        return index
+
+    def block(self, i: int) -> np.ndarray:
+        """The records of the i-th block"""
+        if self.cached[0] == i:
+            return self.cached[1]
+        self.file.seek(self.index[i][1])
+        _, count, length = BLOCK.unpack(self.file.read(BLOCK.size))
+        data = self.file.read(length)
+        if self.compress:
+            data = zlib.decompress(data)
+        records = np.frombuffer(data, dtype=self.dtype, count=count)
+        self.cached = (i, records)
+        return records
+
+    def blocks(self):
+        for i in range(len(self.index)):
+            yield self.block(i)
+
+    def __len__(self) -> int:
+        if not self.index:
+            return 0
+        last = self.block(len(self.index) - 1)
+        return int(last[-1]["round"]) - self.index[0][0] + 1
+
+    def __getitem__(self, round_number: int):
+        """The record of a round, by its round number, reading only the block that contains it"""
+        i = bisect.bisect_right([first for first, _ in self.index], round_number) - 1
+        if i < 0:
+            raise IndexError(f"Round {round_number} is not in the log")
+        records = self.block(i)
+        position = round_number - int(records[0]["round"])
+        if position >= len(records):
+            raise IndexError(f"Round {round_number} is not in the log")
+        return records[position]
+
+    def filter(self, player: int = None, action: Action = None, bet: int = None) -> np.ndarray:
+        """
+        All rounds in which `player` (or any player) made decision `action` and placed a bet of at least `bet`.
+        Conditions that are None are left out. Block by block, so only the matching records are kept in memory.
+        """
+        matches = []
+        for records in self.blocks():
+            seats = slice(None) if player is None else slice(player, player + 1)
+            keep = np.ones(len(records), dtype=bool)
+            if action is not None:
+                keep &= (records["actions"][:, seats] == action.value).any(axis=(1, 2))
+            if bet is not None:
+                keep &= (records["bets"][:, seats] >= bet).any(axis=1)
+            matches.append(records[keep])
+        if not matches:
+            return np.zeros(0, dtype=self.dtype)
+        return np.concatenate(matches)
+
+    def actions(self, record, player: int):
+        """The decisions of a player in a round"""
+        return [Action(a) for a in record["actions"][player, :record["n_actions"][player]]]
+
+    def replay(self, record):
+        """
+        Plays a round of the log again through a `Dealer`, with the same cards, bets and decisions.
+        Returns the dealer, whose `dealer_cards` and `round_hands` show the hands of the round.
+        """
+        from dealer import Dealer
+
+        if not isinstance(record, np.void):
+            record = self[record]
+        cards = np.array(record["cards"][:record["n_cards"]], dtype=np.uint8)
+        deck = Deck(1, 1.0, shoes=iter([cards]))
+        players = [ReplayPlayer(name, int(record["bets"][i]), self.actions(record, i))
+                   for i, name in enumerate(self.players)]
+        dealer = Dealer(deck, players, record_every=0, double_after_split=self.double_after_split)
+        dealer.play_round()
+
+        nets = [player.budget for player in players]
+        if nets != [int(net) for net in record["nets"]] or deck.top != record["n_cards"]:
+            raise ValueError(f"Round {record['round']} doesn't replay as it was logged")
+        return dealer
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class BudgetHistory:
+    """
+    Records the budget of every player over the rounds played.
+
+    The budgets are stored in a preallocated (players, samples) int64 buffer.
+    If more rounds are recorded than were reserved, the buffer grows geometrically,
+    so recording stays amortized O(1) per round.
+
+    Only every `every`-th round is kept, which bounds the memory needed for
+    very long simulations.
+    """
+
+    def __init__(self, n_players: int, capacity: int = 1024, every: int = 1) -> None:
+        if every < 1:
+            raise ValueError("every must be at least 1")
+
+        self.every = every
+        self.buffer = np.zeros((n_players, max(capacity, 1)), dtype=np.int64)
+        # number of samples stored in the buffer
+        self.length = 0
+        # number of rounds recorded, including the ones that were skipped
+        self.rounds = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, player: int) -> np.ndarray:
+        return self.buffer[player, :self.length]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __getstate__(self) -> dict:
+        # only store the samples, not the reserved but unused part of the buffer
+        state = self.__dict__.copy()
+        state["buffer"] = self.view().copy()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self.buffer.shape[1] == 0:
+            self.buffer = np.zeros((self.buffer.shape[0], 1), dtype=np.int64)
+
+    def _samples_for(self, rounds: int) -> int:
+        """Number of samples stored after `rounds` rounds were recorded"""
+        return (rounds + self.every - 1) // self.every
+
+    def _resize(self, capacity: int) -> None:
+        buffer = np.zeros((self.buffer.shape[0], capacity), dtype=np.int64)
+        buffer[:, :self.length] = self.buffer[:, :self.length]
+        self.buffer = buffer
+
+    def reserve(self, n_rounds: int) -> None:
+        """Makes sure `n_rounds` more rounds can be recorded without growing the buffer"""
+        needed = self._samples_for(self.rounds + n_rounds)
+        if needed > self.buffer.shape[1]:
+            # grow geometrically, so reserving in many small chunks stays amortized O(1) per round
+            self._resize(max(needed, 2 * self.buffer.shape[1]))
+
+    def record(self, budgets) -> None:
+        """Records the budgets of all players for one round"""
+        if self.rounds % self.every == 0:
+            if self.length == self.buffer.shape[1]:
+                self._resize(2 * self.buffer.shape[1])
+            self.buffer[:, self.length] = budgets
+            self.length += 1
+        self.rounds += 1
+
+    def view(self) -> np.ndarray:
+        """Returns the recorded budgets as a (players, samples) array without copying"""
+        return self.buffer[:, :self.length]
+
+    def round_numbers(self) -> np.ndarray:
+        """Returns the round number each stored sample belongs to"""
+        return np.arange(self.length, dtype=np.int64) * self.every
@@ -0,0 +1,113 @@
+import time
+from collections import defaultdict
+
+# Phases of a round that don't overlap, in the order they happen
+PHASES = ("bet", "deal", "decide", "dealer draw", "reveal", "settle")
+# Methods every player is timed in, per strategy
+PLAYER_METHODS = ("bet", "decide", "see_cards", "result")
+
+
+class _Timer:
+    """
+    Calls `function` and adds the time it took to `totals[key]`.
+
+    A timer is pickled as the function it wraps, so a dealer with instrumentation can be
+    checkpointed. The dealer attaches its instrumentation again when it is loaded.
+    """
+
+    __slots__ = ("function", "totals", "calls", "key")
+
+    def __init__(self, function, totals, calls, key) -> None:
+        self.function = function
+        self.totals = totals
+        self.calls = calls
+        self.key = key
+
+    def __call__(self, *args):
+        start = time.perf_counter()
+        try:
+            return self.function(*args)
+        finally:
+            self.totals[self.key] += time.perf_counter() - start
+            self.calls[self.key] += 1
+
+    def __reduce__(self):
+        return self.function.__reduce__()
+
+
+class Instrumentation:
+    """
+    Records the time and the number of calls spent in the phases of a `Dealer`.
+
+    Attaching wraps the methods of the dealer and its players with timers,
+    so a dealer without instrumentation doesn't pay anything for it.
+    The timings carry over when an instrumented dealer is checkpointed and resumed.
+
+    Dealer phases:  shuffle, deal, dealer draw, reveal, settle and the whole round
+    Player methods: bet, decide, see_cards and result, per strategy (player name)
+    """
+
+    def __init__(self) -> None:
+        self.time = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def _timed(self, function, key):
+        return _Timer(function, self.time, self.calls, key)
+
+    def attach(self, dealer) -> None:
+        """Wraps the methods of `dealer` and its players with timers"""
+        dealer.shuffle = self._timed(dealer.shuffle, ("shuffle", None))
+        dealer.play_round = self._timed(dealer.play_round, ("round", None))
+        dealer.deal = self._timed(dealer.deal, ("deal", None))
+        dealer.draw_dealer = self._timed(dealer.draw_dealer, ("dealer draw", None))
+        dealer.reveal = self._timed(dealer.reveal, ("reveal", None))
+        dealer.settle = self._timed(dealer.settle, ("settle", None))
+
+        for player in dealer.players:
+            name = player.name
+            for method in PLAYER_METHODS:
+                setattr(player, method, self._timed(getattr(player, method), (method, name)))
+
+    def phase(self, phase: str):
+        """Total time and calls of a phase, summed over all players"""
+        seconds = sum(t for (p, _), t in self.time.items() if p == phase)
+        calls = sum(n for (p, _), n in self.calls.items() if p == phase)
+        return seconds, calls
+
+    def breakdown(self) -> dict:
+        """Time and calls per phase, the time not spent in any phase is listed as 'other'"""
+        phases = {phase: self.phase(phase) for phase in PHASES}
+        rounds_time, rounds = self.phase("round")
+        phases["other"] = (rounds_time - sum(t for t, _ in phases.values()), rounds)
+        phases["shuffle"] = self.phase("shuffle")
+        return phases
+
+    def profile(self) -> dict:
+        """Time and calls of every player method per strategy"""
+        profile = defaultdict(dict)
+        for (method, name), seconds in self.time.items():
+            if name is not None:
+                profile[name][method] = (seconds, self.calls[(method, name)])
+        return dict(profile)
+
+    def report(self) -> str:
+        """Formats the breakdown per phase and the profile per strategy as tables"""
+        rounds_time, rounds = self.phase("round")
+        total = rounds_time + self.phase("shuffle")[0]
+
+        lines = [f"{'phase':<14} {'calls':>10} {'seconds':>9} {'share':>7} {'us/call':>9}"]
+        for phase, (seconds, calls) in self.breakdown().items():
+            share = seconds / total if total else 0.0
+            per_call = 1e6 * seconds / calls if calls else 0.0
+            lines.append(f"{phase:<14} {calls:10d} {seconds:9.3f} {share:7.1%} {per_call:9.2f}")
+        lines.append(f"{'total':<14} {rounds:10d} {total:9.3f}")
+
+        lines.append("")
+        lines.append(f"{'strategy':<16} {'method':<10} {'calls':>10} {'seconds':>9} {'us/call':>9}")
+        for name, methods in self.profile().items():
+            for method in PLAYER_METHODS:
+                seconds, calls = methods.get(method, (0.0, 0))
+                per_call = 1e6 * seconds / calls if calls else 0.0
+                lines.append(f"{name:<16} {method:<10} {calls:10d} {seconds:9.3f} {per_call:9.2f}")
+
+        return "\n".join(lines)
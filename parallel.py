@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dealer import Dealer
+from deck import Deck
+from player import make_player
+from shoes import ShoePool
+
+# Default number of shards, fixed so a seed gives the same result on every machine
+SHARDS = 16
+
+
+class SimulationResult:
+    """Statistics collected for every player of a simulation"""
+
+    def __init__(self, names, wins, draws, losses, budgets, budget_history, round_numbers) -> None:
+        self.names = list(names)
+        self.wins = np.asarray(wins, dtype=np.int64)
+        self.draws = np.asarray(draws, dtype=np.int64)
+        self.losses = np.asarray(losses, dtype=np.int64)
+        # budgets at the end of the simulation
+        self.budgets = np.asarray(budgets, dtype=np.int64)
+        # (players, samples) budgets and the round each sample was taken in
+        self.budget_history = budget_history
+        self.round_numbers = round_numbers
+        self.rounds = 0
+
+    @staticmethod
+    def from_dealer(dealer: Dealer, rounds: int) -> "SimulationResult":
+        history = dealer.budget_history
+        if history is None:
+            budget_history = np.zeros((len(dealer.players), 0), dtype=np.int64)
+            round_numbers = np.zeros(0, dtype=np.int64)
+        else:
+            budget_history = history.view().copy()
+            round_numbers = history.round_numbers()
+        result = SimulationResult(
+            [p.name for p in dealer.players],
+            dealer.wins, dealer.draws, dealer.losses,
+            [p.budget for p in dealer.players],
+            budget_history, round_numbers)
+        result.rounds = rounds
+        return result
+
+    @staticmethod
+    def merge(results) -> "SimulationResult":
+        """
+        Concatenates the results of consecutive shards.
+
+        Every shard starts with a budget of 0,
+        so its history is offset by the final budgets of the shards before it.
+        """
+        histories = []
+        round_numbers = []
+        offset = np.zeros(len(results[0].names), dtype=np.int64)
+        rounds = 0
+        for result in results:
+            histories.append(result.budget_history + offset[:, None])
+            round_numbers.append(result.round_numbers + rounds)
+            offset += result.budgets
+            rounds += result.rounds
+
+        merged = SimulationResult(
+            results[0].names,
+            sum(r.wins for r in results),
+            sum(r.draws for r in results),
+            sum(r.losses for r in results),
+            offset,
+            np.concatenate(histories, axis=1),
+            np.concatenate(round_numbers))
+        merged.rounds = rounds
+        return merged
+
+
+def run_shard(strategies, rounds: int, seed: np.random.SeedSequence, number_of_decks: int = 6,
+              shuffle_point: float = 0.75, record_every: int = 1) -> SimulationResult:
+    """
+    Plays `rounds` rounds on a fresh table, the deck and every player
+    draw from their own generator spawned from `seed`
+    """
+    streams = seed.spawn(len(strategies) + 1)
+    players = [make_player(strategy, np.random.default_rng(stream), number_of_decks)
+               for strategy, stream in zip(strategies, streams[1:])]
+    shoes = ShoePool(number_of_decks, np.random.default_rng(streams[0]))
+    deck = Deck(number_of_decks, shuffle_point, shoes=shoes)
+    dealer = Dealer(deck, players, record_every)
+    dealer.play(rounds, verbose=False)
+    return SimulationResult.from_dealer(dealer, rounds)
+
+
+def run_parallel(strategies, rounds: int, seed: int = None, shards: int = None, workers: int = None,
+                 number_of_decks: int = 6, shuffle_point: float = 0.75, record_every: int = 1):
+    """
+    Simulates `rounds` rounds with the given strategies (numbers of the simulation menu)
+    split into `shards` independent tables, which are played in a process pool.
+    Returns the result of every shard.
+
+    Every shard uses its own generator spawned from `seed`,
+    so the result only depends on `seed` and the number of shards (`SHARDS` by default),
+    not on the number of workers.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    shards = SHARDS if shards is None else shards
+    shards = max(1, min(shards, rounds))
+
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    size, rest = divmod(rounds, shards)
+    sizes = [size + (1 if i < rest else 0) for i in range(shards)]
+
+    strategies = list(strategies)
+    if workers <= 1:
+        results = [run_shard(strategies, n, s, number_of_decks, shuffle_point, record_every)
+                   for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, [strategies] * shards, sizes, seeds,
+                                    [number_of_decks] * shards, [shuffle_point] * shards,
+                                    [record_every] * shards))
+    return results
+
+
+def simulate_parallel(strategies, rounds: int, seed: int = None, shards: int = None, workers: int = None,
+                      number_of_decks: int = 6, shuffle_point: float = 0.75,
+                      record_every: int = 1) -> SimulationResult:
+    """Like `run_parallel`, but merges the shards into one result as if they were played in a row"""
+    return SimulationResult.merge(run_parallel(strategies, rounds, seed, shards, workers,
+                                               number_of_decks, shuffle_point, record_every))
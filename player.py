@@ -1,35 +1,47 @@
-import random
 import sys
-from enum import Enum
 
-from deck import *
+import numpy as np
 
-
-class Action(Enum):
-    """All possible game decisions a player can make"""
-    HIT = 0
-    STAND = 1
-    DOUBLE_DOWN = 2
-    SPLIT = 3
+from counting import RunningCounts
+from deck import VALUES, Card, Deck, Hand
+from strategy import BASIC_STRATEGY, Action, Strategy
 
 
 class Player(object):
     """Class representing a player. Super-class of all the other players."""
 
+    # players that don't care about the cards delt set this to False,
+    # the dealer then never shows them any cards
+    observes_cards = True
+
     def __init__(self, name: str, budget: int) -> None:
         self.name = name
         self.budget = budget
 
-    def see_card(self, card: Card) -> None:
-        """Called by dealer everytime a card is drawn from the deck."""
-        raise NotImplementedError("decide not implemented")
+    def see_cards(self, cards) -> None:
+        """Called by dealer after every round with all cards delt in it (an array of encoded cards),
+        including the player's own cards and the dealer's hole card."""
+        for card in cards:
+            self.see_card(card)
+
+    def see_card(self, card: int) -> None:
+        """Called by `see_cards` for every card, if it isn't overridden."""
+        raise NotImplementedError("see_card not implemented")
+
+    def attach(self, counts: RunningCounts, deck: Deck) -> None:
+        """Called by dealer when the player joins the table, gives access to the running counts."""
+        pass
 
-    def decide(self, cards, dealer_card: Card) -> Action:
+    def seed(self, rng: np.random.Generator) -> None:
+        """Gives the player its own random stream. Players that don't make random decisions ignore it."""
+        pass
+
+    def decide(self, hand: Hand, dealer_card: int) -> Action:
         """Decides the next action of the player.
 
         Keyword arguments:
-        cards -- the players hand
-        dealer -- the dealers first card
+        hand -- the players hand
+        dealer_card -- the dealers first card
         """
         raise NotImplementedError("decide not implemented")
 
@@ -37,7 +49,7 @@ class Player(object):
         """Returns the amount the player bets."""
         raise NotImplementedError("bet not implemented")
 
-    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+    def result(self, winnings: int, player_cards: Hand, dealer_cards: Hand) -> None:
         """Gives the player the winnings of the round."""
         raise NotImplementedError("result not implemented")
 
@@ -49,19 +61,18 @@ class Player(object):
 class CLI_Player(Player):
     """Interactive player to play from the command line."""
 
+    observes_cards = False
+
     def __init__(self, budget: int) -> None:
         Player.__init__(self, "CLI", budget)
         self.last_bet = 0
 
-    def see_card(self, card: Card) -> None:
-        pass
-
-    def decide(self, cards, dealer_card: Card) -> Action:
+    def decide(self, hand: Hand, dealer_card: int) -> Action:
         """Asks the user for an action."""
-        print(f"Dealers card: {dealer_card}")
-        print(f"Your hand ({score(cards)}):")
-        for card in cards:
-            print(card)
+        print(f"Dealers card: {Card.of(dealer_card)}")
+        print(f"Your hand ({hand.total}):")
+        for card in hand:
+            print(Card.of(card))
 
         print()
         print("Choose one of these actions:")
@@ -81,7 +92,7 @@ class CLI_Player(Player):
                         if self.budget < self.last_bet:
                             print("You do not have the budget to double down")
                             continue
-                        if len(cards) != 2:
+                        if hand.size != 2:
                             print("Doubling down is disallowed after hit.")
                             continue
                         return Action.DOUBLE_DOWN
@@ -89,7 +100,7 @@ class CLI_Player(Player):
                         if self.budget < self.last_bet:
                             print("You do not have the budget to split")
                             continue
-                        if len(cards) != 2 or cards[0].value() != cards[1].value():
+                        if not hand.pair:
                             print("You cannot split.")
                             continue
                         return Action.SPLIT
@@ -120,7 +131,7 @@ class CLI_Player(Player):
             except ValueError:
                 pass
 
-    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+    def result(self, winnings: int, player_cards: Hand, dealer_cards: Hand) -> None:
         """Informs the user about the results."""
         self.budget += winnings
 
@@ -129,10 +140,10 @@ class CLI_Player(Player):
         else:
             print("Looks like you've lost")
 
-        print(f"Your cards: {player_cards}")
-        print(f"Your score: {score(player_cards)}")
-        print(f"Dealer's cards: {dealer_cards}")
-        print(f"Dealer's score: {score(dealer_cards)}")
+        print(f"Your cards: {[Card.of(card) for card in player_cards]}")
+        print(f"Your score: {player_cards.total}")
+        print(f"Dealer's cards: {[Card.of(card) for card in dealer_cards]}")
+        print(f"Dealer's score: {dealer_cards.total}")
 
     def on_shuffle(self) -> None:
         print("Deck was shuffled")
@@ -141,125 +152,26 @@ class CLI_Player(Player):
 # implemented after rules from
 # https://www.blackjackapprenticeship.com/blackjack-strategy-charts/
 class Optimal_Player(Player):
-    """Player that implements the theoretically optimal strategy without card counting."""
+    """Player that implements the theoretically optimal strategy without card counting.
 
-    def __init__(self, budget: int) -> None:
-        Player.__init__(self, "Optimal Player", budget)
+    The strategy is a chart compiled into lookup tables,
+    by default the basic strategy from charts/basic_strategy.json.
+    """
 
-    def see_card(self, card: Card) -> None:
-        pass
+    observes_cards = False
 
-    def decide(self, cards, dealer_card: Card) -> Action:
-        """Returns the optimal decision based on the rules from:
-        https://www.blackjackapprenticeship.com/blackjack-strategy-charts/ 
-        """
-        hand_value = score(cards)
-
-        strat = None
-
-        # check for splits
-        if len(cards) == 2 and cards[0].value() == cards[1].value():
-            match cards[0].value():
-                case 11 | 8: return Action.SPLIT
-                case 9:
-                    if dealer_card.value() <= 9 and dealer_card != 7:
-                        return Action.SPLIT
-                    else:
-                        return Action.STAND
-                case 7 | 3 | 2:
-                    if dealer_card.value() <= 7:
-                        return Action.SPLIT
-                    else:
-                        return Action.HIT
-                case 6:
-                    if dealer_card.value() <= 6:
-                        return Action.SPLIT
-                    else:
-                        return Action.HIT
-                case 5:
-                    if dealer_card.value() <= 9:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-                case 4:
-                    if 5 <= dealer_card.value() <= 6:
-                        return Action.SPLIT
-                    else:
-                        return Action.HIT
-
-        # soft totals and hard totals
-        # get the total sum of the players' hand
-        value_sum = sum(card.value() for card in cards)
-        num_aces = [card.value() for card in cards].count(11)
-
-        # checks if there is an ace in the hand that is counted as 11
-        if value_sum - hand_value != num_aces * 10:
-            # soft totals
-            match hand_value:
-                case 20: return Action.STAND
-                case 19:
-                    if dealer_card.value() == 6:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.STAND
-                case 18:
-                    if 2 <= dealer_card.value() <= 6:
-                        return Action.DOUBLE_DOWN
-                    elif 9 <= dealer_card.value():
-                        return Action.HIT
-                    else:
-                        return Action.STAND
-                case 17:
-                    if 3 <= dealer_card.value() <= 6:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-                case 16 | 15:
-                    if 4 <= dealer_card.value() <= 6:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-                case 14 | 13:
-                    if 5 <= dealer_card.value() <= 6:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-        else:
-            # hard totals
-            match hand_value:
-                case 20 | 19 | 18 | 17:
-                    return Action.STAND
-                case 16 | 15 | 14 | 13:
-                    if 2 <= dealer_card.value() <= 6:
-                        return Action.STAND
-                    else:
-                        return Action.HIT
-                case 12:
-                    if 4 <= dealer_card.value() <= 6:
-                        return Action.STAND
-                    else:
-                        return Action.HIT
-                case 11:
-                    return Action.DOUBLE_DOWN
-                case 10:
-                    if 2 <= dealer_card.value() <= 9:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-                case 9:
-                    if 3 <= dealer_card.value() <= 6:
-                        return Action.DOUBLE_DOWN
-                    else:
-                        return Action.HIT
-            if hand_value <= 8:
-                return Action.HIT
+    def __init__(self, budget: int, strategy: Strategy = BASIC_STRATEGY) -> None:
+        Player.__init__(self, "Optimal Player", budget)
+        self.strategy = strategy
 
-        raise ValueError("Impossible Hand")
+    def decide(self, hand: Hand, dealer_card: int) -> Action:
+        """Looks up the decision for the hand in the strategy chart"""
+        return self.strategy.decide(hand, VALUES[dealer_card])
 
     def bet(self) -> int:
         return 100
 
-    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+    def result(self, winnings: int, player_cards: Hand, dealer_cards: Hand) -> None:
         self.budget += winnings
 
     def on_shuffle(self) -> None:
@@ -277,34 +189,55 @@ STRAT_10_COUNT = [0,  0, +1, +1, +1, +1, +1, +1, +1, +1, -2, +1]
 
 
 class Card_Counter(Optimal_Player):
-    """Player that performs card counting according to a passed in strategy"""
+    """Player that performs card counting according to a passed in strategy
+
+    The count is read from the running counts of the table, so it doesn't need to observe cards.
+    """
 
-    def __init__(self, name: str, budget: int, num_decks: int, strat) -> None:
-        Optimal_Player.__init__(self, budget)
+    def __init__(self, name: str, budget: int, num_decks: int, strat,
+                 strategy: Strategy = BASIC_STRATEGY, unit: int = 100, spread: int = None, ramp=None) -> None:
+        Optimal_Player.__init__(self, budget, strategy)
         self.name = name
-        self.score = 0
         self.num_decks = num_decks
-        self.left_decks = self.num_decks-1
-        self.seen_cards = 0
         self.strat = strat
+        # bet `unit` per point of the count, at most `spread` units
+        self.unit = unit
+        self.spread = spread
+        # a `ramp.Ramp` replaces the bets above with a bet per true count
+        self.ramp = ramp
+        self.counts = None
+        self.deck = None
+        self.row = 0
+
+    def attach(self, counts: RunningCounts, deck: Deck) -> None:
+        """Reads the count of this players strategy from the running counts of the table"""
+        self.counts = counts
+        self.deck = deck
+        self.row = counts.add(self.strat)
+
+    @property
+    def score(self) -> int:
+        """The running count of all cards delt since the last shuffle"""
+        if self.counts is None:
+            return 0
+        return self.counts.count(self.row, self.deck.top)
 
-    def count(self, card: Card) -> None:
-        """Adjusts the current count bases on the strategy this player was initialized with"""
-
-        self.seen_cards += 1
-
-        # we've seen an entire deck (52 cards)
-        # so we need to adjust the number of decks left to be delt
-        if self.seen_cards == 52:
-            self.seen_cards = 0
-            self.left_decks -= 1
-
-        self.score += self.strat[card.value()]
+    @property
+    def left_decks(self) -> int:
+        """Number of entire decks (52 cards) that are still to be delt"""
+        seen = 0 if self.deck is None else self.deck.top
+        return self.num_decks - 1 - seen // 52
 
-    def see_card(self, card: Card) -> None:
-        self.count(card)
+    def true_count(self) -> float:
+        """The running count divided by the number of decks that are still to be delt"""
+        if self.deck is None:
+            return 0.0
+        decks = (len(self.deck.cards) - self.deck.top) / 52
+        return self.score / max(decks, 0.5)
 
     def bet(self) -> int:
+        if self.ramp is not None:
+            return self.ramp(self.true_count())
         if self.score <= 0:
             return 0
 
@@ -312,37 +245,54 @@ class Card_Counter(Optimal_Player):
         # compute the amout to bet based on the "true score"
         # The true score is simply computed by dividing the current score
         # by the number of decks left to be delt.
-        bet = 100 * int(self.score / num_decks)
+        units = int(self.score / num_decks)
+        if self.spread is not None:
+            units = min(units, self.spread)
+        bet = self.unit * units
         return bet
 
     def on_shuffle(self) -> None:
-        self.score = 0
-        self.left_decks = self.num_decks-1
-        self.seen_cards = 0
+        pass
+
+
+RANDOM_ACTIONS = tuple(Action)
+# random numbers drawn from the generator at once
+RANDOM_BATCH = 4096
 
 
 class RandomPlayer(Player):
     """Player that plays completely random moves and bets random amount"""
 
-    def __init__(self, budget: int) -> None:
+    observes_cards = False
+
+    def __init__(self, budget: int, rng: np.random.Generator = None) -> None:
         Player.__init__(self, "Random Player", budget)
         self.last_bet = 0
+        self.rng = np.random.default_rng() if rng is None else rng
+        # uniform numbers in [0, 1), drawn in batches since every call to the generator has a fixed overhead
+        self.uniform = []
 
-    def see_card(self, card: Card) -> None:
-        pass
+    def seed(self, rng: np.random.Generator) -> None:
+        self.rng = rng
+        self.uniform = []
 
-    def decide(self, cards, dealer_card: Card) -> Action:
-        if len(cards) == 2 and cards[0].value() == cards[1].value():
-            return random.choice(list(Action))
-        else:
-            return random.choice([Action.HIT, Action.STAND, Action.DOUBLE_DOWN])
+    def random(self) -> float:
+        if not self.uniform:
+            self.uniform = self.rng.random(RANDOM_BATCH).tolist()
+            self.uniform.reverse()
+        return self.uniform.pop()
+
+    def decide(self, hand: Hand, dealer_card: int) -> Action:
+        # splitting is only possible with a pair, it's the last action
+        choices = 4 if hand.pair else 3
+        return RANDOM_ACTIONS[int(self.random() * choices)]
 
     def bet(self) -> int:
-        self.last_bet = random.randint(0, 1000)
+        self.last_bet = int(self.random() * 1001)
 
         return self.last_bet
 
-    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+    def result(self, winnings: int, player_cards: Hand, dealer_cards: Hand) -> None:
         self.budget += winnings
 
     def on_shuffle(self) -> None:
@@ -352,16 +302,15 @@ class RandomPlayer(Player):
 class AveragePlayer(Player):
     """Player simulating the behaviour of a average person that is pretty bad at Blackjack."""
 
+    observes_cards = False
+
     def __init__(self, budget: int) -> None:
         Player.__init__(self, "Average Player", budget)
         self.mood = "average"
         self.last_bet = 100
         self.last_result = "draw"
 
-    def see_card(self, card: Card) -> None:
-        pass
-
-    def decide(self, cards, dealer_card: Card) -> Action:
+    def decide(self, hand: Hand, dealer_card: int) -> Action:
         """ Decides the next action based on the results of the last round
 
         Plays: 
@@ -379,9 +328,9 @@ class AveragePlayer(Player):
                 threshold -= 3
             case 'risky':
                 threshold += 2
-                if score(cards) == 11:
+                if hand.total == 11:
                     return Action.DOUBLE_DOWN
-        if score(cards) <= threshold:
+        if hand.total <= threshold:
             return Action.HIT
         else:
             return Action.STAND
@@ -398,15 +347,15 @@ class AveragePlayer(Player):
 
         return self.last_bet
 
-    def result(self, winnings: int, player_cards, dealer_cards) -> None:
+    def result(self, winnings: int, player_cards: Hand, dealer_cards: Hand) -> None:
         """Simulate basic behaviour based on results of last round
 
         Sets the "mood" depending on the result of the last round
         """
-        if score(player_cards) > 21:
+        if player_cards.total > 21:
             self.mood = "careful"
             self.last_result = "lose"
-        elif score(player_cards) <= 21 and winnings == 0:
+        elif player_cards.total <= 21 and winnings == 0:
             self.mood = "risky"
             self.last_result = "lose"
         if winnings == self.last_bet:
@@ -420,3 +369,25 @@ class AveragePlayer(Player):
 
     def on_shuffle(self) -> None:
         pass
+
+
+def make_player(strategy: str, rng: np.random.Generator = None, num_decks: int = 6,
+                unit: int = 100, spread: int = None) -> Player:
+    """
+    Creates a player for one of the strategies of the simulation menu,
+    `rng` is used by the players that make random decisions.
+    Card counters are told the number of decks and bet `unit` per point of the count, at most `spread` units.
+    """
+    counter = {"unit": unit, "spread": spread}
+    match strategy:
+        case "0": return RandomPlayer(0, rng)
+        case "1": return AveragePlayer(0)
+        case "2": return Optimal_Player(0)
+        case "3": return Card_Counter("Hi-Lo", 0, num_decks, STRAT_HI_LO, **counter)
+        case "4": return Card_Counter("Hi-Opt I", 0, num_decks, STRAT_HI_OPTI, **counter)
+        case "5": return Card_Counter("Hi-Opt II", 0, num_decks, STRAT_HI_OPTII, **counter)
+        case "6": return Card_Counter("KO", 0, num_decks, STRAT_KO, **counter)
+        case "7": return Card_Counter("Omega II", 0, num_decks, STRAT_OMEGAII, **counter)
+        case "8": return Card_Counter("Zen Count", 0, num_decks, STRAT_ZEN_COUNT, **counter)
+        case "9": return Card_Counter("10 Count", 0, num_decks, STRAT_10_COUNT, **counter)
+    raise ValueError(f"Unknown strategy '{strategy}'")
@@ -0,0 +1,80 @@
+import numpy as np
+
+# A plot is at most a few thousand pixels wide, drawing more points than that changes nothing
+POINTS = 2000
+
+
+def _at(x, index: np.ndarray) -> np.ndarray:
+    """The x values of the samples at `index`, `x` is an array or the number of rounds between two samples"""
+    if np.isscalar(x):
+        return index * x
+    return np.asarray(x[index])
+
+
+def envelope(x, y, points: int = POINTS):
+    """
+    Downsamples a curve to about `2 * points` points, keeping its shape.
+
+    `x` holds the round of every sample, or is the number of rounds between two samples,
+    which saves building an array as long as the history.
+
+    The curve is split into `points` buckets of consecutive samples,
+    of every bucket only the lowest and highest sample are kept, in their original order.
+    A line through them looks the same as one through all samples,
+    every peak and dip is still drawn.
+    Works on memory maps without loading more than one pass over the data.
+    """
+    n = len(y)
+    if n <= 2 * points:
+        return _at(x, np.arange(n)), np.asarray(y)
+
+    size = n // points
+    used = size * points
+    blocks = np.asarray(y[:used]).reshape(points, size)
+    offsets = np.arange(points) * size
+    low = blocks.argmin(axis=1) + offsets
+    high = blocks.argmax(axis=1) + offsets
+
+    # the samples that don't fill a whole bucket, and the end points, are kept as well
+    tail = np.asarray(y[used:])
+    extra = [0, n - 1]
+    if len(tail):
+        extra += [used + tail.argmin(), used + tail.argmax()]
+
+    index = np.unique(np.concatenate((low, high, extra)))
+    return _at(x, index), np.asarray(y[index])
+
+
+def plot_budgets(ax, x, histories, names, points: int = POINTS) -> None:
+    """Draws the budget of every player over the rounds, downsampled with `envelope`"""
+    for budgets, name in zip(histories, names):
+        ax.plot(*envelope(x, budgets, points), marker='', linestyle='-', label=name)
+
+
+def plot_band(ax, x, runs, name: str, level: float = 0.95, points: int = POINTS) -> None:
+    """
+    Draws the mean budget of one player over independent runs, e.g. the shards of
+    `parallel.run_parallel`, with the range the central `level` of the runs stayed in shaded.
+
+    `runs` holds the budget history of every run, runs of different lengths are cut to the shortest.
+    The band is computed on `points` evenly spaced samples. `x` is like in `envelope`.
+    """
+    length = min(len(run) for run in runs)
+    index = np.unique(np.linspace(0, length - 1, points).astype(np.int64))
+    # only the samples are read, so long or on-disk runs are never loaded completely
+    samples = np.stack([np.asarray(run[index]) for run in runs])
+    x = _at(x, index)
+
+    tail = (1 - level) / 2
+    low, high = np.quantile(samples, [tail, 1 - tail], axis=0)
+    line, = ax.plot(x, samples.mean(axis=0), marker='', linestyle='-', label=name)
+    ax.fill_between(x, low, high, color=line.get_color(), alpha=0.2, linewidth=0)
+
+
+def label(ax) -> None:
+    """Adds the labels, legend and grid shared by all budget plots"""
+    ax.set_xlabel('Rounds Played')
+    ax.set_ylabel('Player Budget')
+    ax.set_title('Player Budget over Rounds')
+    ax.legend()
+    ax.grid(True)
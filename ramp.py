@@ -0,0 +1,126 @@
+import itertools
+
+import numpy as np
+
+from dealer import Dealer
+from deck import Deck
+from player import STRAT_HI_LO, Card_Counter
+from shoes import ShoePool
+from stats import TrueCountHistogram
+
+
+class Ramp:
+    """
+    Bet per true count: `bets[i]` is bet at a true count of `low + i`,
+    lower and higher true counts bet the first and last amount
+    """
+
+    def __init__(self, low: int, bets) -> None:
+        self.low = low
+        self.bets = [int(bet) for bet in bets]
+
+    def __call__(self, true_count: float) -> int:
+        index = min(max(int(np.floor(true_count)) - self.low, 0), len(self.bets) - 1)
+        return self.bets[index]
+
+    def __repr__(self) -> str:
+        return f"Ramp({self.low}, {self.bets})"
+
+
+def record(strat=STRAT_HI_LO, rounds: int = 1_000_000, number_of_decks: int = 6, shuffle_point: float = 0.75,
+           seed: int = None, low: int = -10, high: int = 10) -> TrueCountHistogram:
+    """
+    Plays a counter with the count `strat` and a flat bet in every round, and records
+    the distribution of its outcomes per true count. Any ramp can be evaluated on it afterwards.
+    """
+    histogram = TrueCountHistogram(0, low, high)
+    ramp = Ramp(low, [100] * (high - low + 1))
+    counter = Card_Counter("Counter", 0, number_of_decks, strat, ramp=ramp)
+    shoes = ShoePool(number_of_decks, np.random.default_rng(seed))
+    dealer = Dealer(Deck(number_of_decks, shuffle_point, shoes=shoes), [counter], record_every=0,
+                    stats=[histogram])
+    dealer.play(rounds, verbose=False)
+    return histogram
+
+
+def _moments(histogram: TrueCountHistogram):
+    """Probability of every true count and the first two moments of the outcome per unit bet at it"""
+    counts = histogram.counts
+    total = max(counts.sum(), 1)
+    outcomes = histogram.outcomes()
+    frequency = counts.sum(axis=1) / total
+    m1 = counts @ outcomes / total
+    m2 = counts @ outcomes ** 2 / total
+    return frequency, m1, m2
+
+
+def evaluate(histogram: TrueCountHistogram, ramps) -> dict:
+    """
+    EV and standard deviation per round, SCORE and average bet of every ramp, without simulating.
+
+    `ramps` is a (ramps, true counts) array of bets per true count of the histogram.
+    SCORE is the win rate per 100 rounds of a player betting the ramp scaled to optimal (Kelly)
+    bets for a bankroll of 10000, i.e. 1e6 * (EV / SD)^2. It doesn't depend on the size of the unit.
+    """
+    ramps = np.asarray(ramps, dtype=np.float64)
+    frequency, m1, m2 = _moments(histogram)
+    ev = ramps @ m1
+    sd = np.sqrt(np.maximum(ramps ** 2 @ m2 - ev ** 2, 0))
+    score = np.where(sd > 0, 1e6 * (ev / np.where(sd > 0, sd, 1)) ** 2 * np.sign(ev), 0)
+    return {"ev": ev, "sd": sd, "score": score, "average_bet": ramps @ frequency}
+
+
+def linear_ramps(histogram: TrueCountHistogram, min_bet: int = 100, spreads=(4, 8, 12, 16), starts=(0, 1, 2),
+                 slopes=(1, 2, 3, 4), wong=(None, -1, 0)) -> np.ndarray:
+    """
+    Ramps that bet `min_bet` up to a true count of `start`, then `slope` more units per true count,
+    up to `spread` units. With `wong` nothing is bet below that true count (leaving the table).
+    A player sitting out uses no cards, so a real table plays a few more rounds per shoe
+    and the EV and SD per round come out slightly lower than evaluated.
+    Returns a (ramps, true counts) array of all combinations.
+    """
+    true_counts = histogram.true_counts()
+    ramps = []
+    for spread, start, slope, leave in itertools.product(spreads, starts, slopes, wong):
+        units = np.clip(1 + slope * (true_counts - start), 1, spread)
+        if leave is not None:
+            units = np.where(true_counts < leave, 0, units)
+        ramps.append(min_bet * units)
+    return np.array(ramps, dtype=np.int64)
+
+
+def kelly_ramps(histogram: TrueCountHistogram, bankroll: int, fractions=(0.25, 0.5, 0.75, 1.0),
+                min_bet: int = 100, max_bet: int = None) -> np.ndarray:
+    """
+    Ramps that bet a fraction of the Kelly bet at every true count: `fraction * bankroll * edge / variance`,
+    at least `min_bet` and at most `max_bet`
+    """
+    frequency, m1, m2 = _moments(histogram)
+    seen = np.maximum(frequency, 1e-12)
+    edge = m1 / seen
+    variance = np.maximum(m2 / seen - edge ** 2, 1e-12)
+    kelly = bankroll * np.maximum(edge, 0) / variance
+
+    max_bet = np.inf if max_bet is None else max_bet
+    ramps = [np.clip(fraction * kelly, min_bet, max_bet) for fraction in fractions]
+    return np.array(ramps).round().astype(np.int64)
+
+
+def optimize(histogram: TrueCountHistogram, ramps, by: str = "score", max_sd: float = None,
+             max_average_bet: float = None):
+    """
+    The ramp with the highest `by` ("score" or "ev") among those within the constraints.
+    Returns it as a `Ramp` with its evaluation, or None if no ramp meets the constraints.
+    """
+    ramps = np.asarray(ramps)
+    result = evaluate(histogram, ramps)
+    allowed = np.ones(len(ramps), dtype=bool)
+    if max_sd is not None:
+        allowed &= result["sd"] <= max_sd
+    if max_average_bet is not None:
+        allowed &= result["average_bet"] <= max_average_bet
+    if not allowed.any():
+        return None
+
+    best = np.flatnonzero(allowed)[np.argmax(result[by][allowed])]
+    return Ramp(histogram.low, ramps[best]), {key: values[best] for key, values in result.items()}
@@ -0,0 +1,160 @@
+import json
+import os
+
+import numpy as np
+
+FORMAT = "blackjacksim-results"
+VERSION = 1
+HEADER = "header.json"
+DTYPE = np.dtype("<i8")
+
+
+def _write_header(directory: str, header: dict) -> None:
+    temporary = os.path.join(directory, HEADER + ".tmp")
+    with open(temporary, "w") as f:
+        json.dump(header, f, indent=4)
+    os.replace(temporary, os.path.join(directory, HEADER))
+
+
+def _column(path: str, length: int) -> np.ndarray:
+    """Memory-maps the first `length` budgets of a column file"""
+    if length == 0:
+        return np.zeros(0, dtype=DTYPE)
+    return np.memmap(path, dtype=DTYPE, mode="r", shape=(length,))
+
+
+class DiskHistory:
+    """
+    Records the budget history to disk instead of memory, as one raw int64 file per player
+    and a JSON header describing them.
+
+    Samples are collected in a small in-memory chunk, which is appended to the files
+    whenever it is full, so the history is written incrementally while the simulation runs.
+    It can be used in place of a `BudgetHistory`, see `Dealer`.
+    """
+
+    def __init__(self, directory: str, names, every: int = 1, chunk: int = 1 << 16) -> None:
+        if every < 1:
+            raise ValueError("every must be at least 1")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.names = list(names)
+        self.every = every
+        self.files = [f"player_{i}.i64" for i in range(len(self.names))]
+        self.chunk = np.zeros((len(self.names), chunk), dtype=DTYPE)
+        # number of samples in the chunk and in the files
+        self.pending = 0
+        self.flushed = 0
+        self.rounds = 0
+
+        for name in self.files:
+            open(os.path.join(directory, name), "wb").close()
+        self._write_header()
+
+    def __len__(self) -> int:
+        return self.flushed + self.pending
+
+    def __getitem__(self, player: int) -> np.ndarray:
+        return self.view()[player]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __getstate__(self) -> dict:
+        # everything recorded is in the files, the empty chunk only needs its size
+        self.flush()
+        state = self.__dict__.copy()
+        state["chunk"] = self.chunk.shape[1]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        # the files may have grown after the state was saved, cut them back
+        self.__dict__.update(state)
+        self.chunk = np.zeros((len(self.names), state["chunk"]), dtype=DTYPE)
+        for name in self.files:
+            with open(os.path.join(self.directory, name), "r+b") as f:
+                f.truncate(self.flushed * DTYPE.itemsize)
+        self._write_header()
+
+    def _write_header(self) -> None:
+        _write_header(self.directory, {
+            "format": FORMAT,
+            "version": VERSION,
+            "names": self.names,
+            "files": self.files,
+            "dtype": DTYPE.str,
+            "every": self.every,
+            "length": self.flushed,
+            "rounds": self.rounds,
+        })
+
+    def reserve(self, n_rounds: int) -> None:
+        """Nothing to reserve, the files grow as needed"""
+        pass
+
+    def record(self, budgets) -> None:
+        """Records the budgets of all players for one round"""
+        if self.rounds % self.every == 0:
+            self.chunk[:, self.pending] = budgets
+            self.pending += 1
+            if self.pending == self.chunk.shape[1]:
+                self.flush()
+        self.rounds += 1
+
+    def flush(self) -> None:
+        """Appends the collected samples to the files and updates the header"""
+        if self.pending:
+            for i, name in enumerate(self.files):
+                with open(os.path.join(self.directory, name), "ab") as f:
+                    f.write(self.chunk[i, :self.pending].tobytes())
+            self.flushed += self.pending
+            self.pending = 0
+        self._write_header()
+
+    def view(self):
+        """Flushes and returns a read-only memory map of every player's budgets"""
+        self.flush()
+        return [_column(os.path.join(self.directory, name), self.flushed) for name in self.files]
+
+    def round_numbers(self) -> np.ndarray:
+        """Returns the round number each stored sample belongs to"""
+        return np.arange(len(self), dtype=np.int64) * self.every
+
+
+class Results:
+    """Budget histories of a simulation that were written to disk by a `DiskHistory`"""
+
+    def __init__(self, directory: str) -> None:
+        with open(os.path.join(directory, HEADER)) as f:
+            header = json.load(f)
+        if header.get("format") != FORMAT or header.get("version") != VERSION:
+            raise ValueError(f"{directory} does not contain simulation results")
+
+        self.directory = directory
+        self.names = header["names"]
+        self.every = header["every"]
+        self.length = header["length"]
+        self.rounds = header["rounds"]
+        self.columns = [_column(os.path.join(directory, name), self.length)
+                        for name in header["files"]]
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, player) -> np.ndarray:
+        """Budgets of a player, by index or by name, memory-mapped and not loaded into RAM"""
+        if isinstance(player, str):
+            player = self.names.index(player)
+        return self.columns[player]
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def round_numbers(self) -> np.ndarray:
+        return np.arange(self.length, dtype=np.int64) * self.every
+
+
+def load_results(directory: str) -> Results:
+    """Opens the results written to `directory` without loading them into memory"""
+    return Results(directory)
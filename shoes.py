@@ -0,0 +1,87 @@
+import queue
+import threading
+
+import numpy as np
+
+from deck import new_shoe
+
+
+class ShoePool:
+    """
+    Endless supply of shuffled shoes for a `Deck`, generated `batch` at a time.
+
+    A batch is a (batch, 52 * decks) uint8 array in which every row is shuffled independently,
+    the deck gets its rows as views, so nothing is copied or shuffled when the deck runs out.
+    With `background` the next batches are generated by a thread while the simulation plays,
+    the shoes are the same as without it. Call `close` to stop the thread.
+
+        deck = Deck(6, 0.75, shoes=ShoePool(6, rng))
+    """
+
+    def __init__(self, number_of_decks: int, rng: np.random.Generator = None, batch: int = 1024,
+                 background: bool = False, prefetch: int = 2) -> None:
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.number_of_decks = number_of_decks
+        self.template = np.tile(new_shoe(number_of_decks), (batch, 1))
+        self.shoes = self.template[:0]
+        self.next = 0
+        # state of the generator before the current batch was generated
+        self.batch_state = None
+
+        self.queue = None
+        self.closed = False
+        if background:
+            self.queue = queue.Queue(maxsize=prefetch)
+            threading.Thread(target=self._produce, daemon=True).start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> np.ndarray:
+        if self.next == len(self.shoes):
+            if self.queue is None:
+                self.batch_state = self.rng.bit_generator.state
+                self.shoes = self._generate()
+            else:
+                self.shoes = self.queue.get()
+            self.next = 0
+        shoe = self.shoes[self.next]
+        self.next += 1
+        return shoe
+
+    def __getstate__(self) -> dict:
+        if self.queue is not None:
+            # the thread has drawn ahead from the generator, its state can't be restored
+            raise TypeError("a ShoePool generating in the background can't be pickled")
+        # the template and the current batch are rebuilt when loading,
+        # the batch from the state the generator had before it was generated
+        state = self.__dict__.copy()
+        state["template"] = len(self.template)
+        state["shoes"] = len(self.shoes)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.template = np.tile(new_shoe(self.number_of_decks), (state["template"], 1))
+        self.shoes = self.template[:0]
+        if state["shoes"]:
+            rng = np.random.Generator(type(self.rng.bit_generator)())
+            rng.bit_generator.state = self.batch_state
+            self.shoes = rng.permuted(self.template, axis=1)
+
+    def _generate(self) -> np.ndarray:
+        return self.rng.permuted(self.template, axis=1)
+
+    def _produce(self) -> None:
+        while not self.closed:
+            shoes = self._generate()
+            while not self.closed:
+                try:
+                    self.queue.put(shoes, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def close(self) -> None:
+        """Stops the background thread"""
+        self.closed = True
@@ -0,0 +1,206 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+class Statistic:
+    """
+    Base class of the online statistics a `Dealer` feeds after every round.
+
+    Statistics only keep a constant amount of memory, no matter how many rounds are played.
+    """
+
+    def start_round(self, dealer) -> None:
+        """Called before the players place their bets."""
+        pass
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        """Called after the round was settled with the budgets and the net winnings of every player."""
+        raise NotImplementedError("end_round not implemented")
+
+    def report(self) -> dict:
+        """Returns the collected statistics."""
+        raise NotImplementedError("report not implemented")
+
+
+class MeanVariance(Statistic):
+    """Mean and variance of the net winnings per round of every player (Welford's algorithm)"""
+
+    def __init__(self, n_players: int) -> None:
+        self.n = 0
+        self.mean = np.zeros(n_players)
+        self.m2 = np.zeros(n_players)
+
+    def add(self, nets: np.ndarray) -> None:
+        self.n += 1
+        delta = nets - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (nets - self.mean)
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        self.add(nets)
+
+    def variance(self) -> np.ndarray:
+        if self.n < 2:
+            return np.zeros_like(self.m2)
+        return self.m2 / (self.n - 1)
+
+    def std_error(self) -> np.ndarray:
+        """Standard error of the mean"""
+        if self.n < 2:
+            return np.full_like(self.m2, np.inf)
+        return np.sqrt(self.variance() / self.n)
+
+    def report(self) -> dict:
+        return {
+            "rounds": self.n,
+            "mean": self.mean.copy(),
+            "std": np.sqrt(self.variance()),
+            "std_error": self.std_error(),
+        }
+
+
+class Difference(MeanVariance):
+    """
+    Mean and variance of the difference between the net winnings of players `a` and `b` per round.
+
+    Both play at the same table, so the difference is paired and has a smaller variance
+    than the two means on their own.
+    """
+
+    def __init__(self, a: int, b: int) -> None:
+        MeanVariance.__init__(self, 1)
+        self.a = a
+        self.b = b
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        self.add(nets[self.a:self.a + 1] - nets[self.b:self.b + 1])
+
+
+class Drawdown(Statistic):
+    """Largest drop of every player's budget from a previous high"""
+
+    def __init__(self, n_players: int) -> None:
+        self.peak = np.zeros(n_players, dtype=np.int64)
+        self.max_drawdown = np.zeros(n_players, dtype=np.int64)
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        np.maximum(self.peak, budgets, out=self.peak)
+        np.maximum(self.max_drawdown, self.peak - budgets, out=self.max_drawdown)
+
+    def report(self) -> dict:
+        return {"peak": self.peak.copy(), "max_drawdown": self.max_drawdown.copy()}
+
+
+class BustRate(Statistic):
+    """How often the hands of every player and the dealer went over 21"""
+
+    def __init__(self, n_players: int) -> None:
+        self.hands = np.zeros(n_players, dtype=np.int64)
+        self.busts = np.zeros(n_players, dtype=np.int64)
+        self.rounds = 0
+        self.dealer_busts = 0
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        self.rounds += 1
+        self.dealer_busts += dealer.dealer_cards.total > 21
+        for i, hands_and_wins in enumerate(dealer.round_hands):
+            if hands_and_wins is None:
+                continue
+            for hand in hands_and_wins[0]:
+                self.hands[i] += 1
+                self.busts[i] += hand.total > 21
+
+    def report(self) -> dict:
+        return {
+            "player": self.busts / np.maximum(self.hands, 1),
+            "dealer": self.dealer_busts / max(self.rounds, 1),
+        }
+
+
+class Outcomes(Statistic):
+    """How often every amount of net winnings occurred in a round, for one player"""
+
+    def __init__(self, player: int) -> None:
+        self.player = player
+        self.counts = defaultdict(int)
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        self.counts[int(nets[self.player])] += 1
+
+    def report(self) -> dict:
+        outcomes = np.array(sorted(self.counts), dtype=np.int64)
+        counts = np.array([self.counts[o] for o in outcomes], dtype=np.int64)
+        return {"outcomes": outcomes, "counts": counts}
+
+
+class TrueCountHistogram(Statistic):
+    """
+    Distribution of the outcome of a round per true count, for one card counting player.
+
+    Outcomes are counted in units of the bet placed in the round, e.g. -2 for a lost double down,
+    and rounds without a bet are skipped. True counts are rounded down and clipped to [low, high].
+    """
+
+    def __init__(self, player: int, low: int = -10, high: int = 10, max_units: int = 16) -> None:
+        self.player = player
+        self.low = low
+        self.max_units = max_units
+        self.counts = np.zeros((high - low + 1, 2 * max_units + 1), dtype=np.int64)
+        self.bucket = 0
+
+    def start_round(self, dealer) -> None:
+        true_count = dealer.players[self.player].true_count()
+        self.bucket = min(max(int(np.floor(true_count)) - self.low, 0), len(self.counts) - 1)
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        bet = dealer.bets[self.player]
+        if bet == 0:
+            return
+        units = min(max(int(nets[self.player]) // bet, -self.max_units), self.max_units)
+        self.counts[self.bucket, units + self.max_units] += 1
+
+    def true_counts(self) -> np.ndarray:
+        return np.arange(self.low, self.low + len(self.counts))
+
+    def outcomes(self) -> np.ndarray:
+        return np.arange(-self.max_units, self.max_units + 1)
+
+    def report(self) -> dict:
+        rounds = self.counts.sum(axis=1)
+        ev = (self.counts @ self.outcomes()) / np.maximum(rounds, 1)
+        return {"true_count": self.true_counts(), "rounds": rounds, "ev": ev}
+
+
+class Reservoir(Statistic):
+    """
+    A uniform random sample of `size` points of the budget trajectories (reservoir sampling),
+    which is enough to plot the trajectories of runs that are too long to record.
+    """
+
+    def __init__(self, n_players: int, size: int = 10000, rng: np.random.Generator = None) -> None:
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.rounds = np.zeros(size, dtype=np.int64)
+        self.budgets = np.zeros((size, n_players), dtype=np.int64)
+        self.seen = 0
+
+    def end_round(self, dealer, budgets: np.ndarray, nets: np.ndarray) -> None:
+        size = len(self.rounds)
+        if self.seen < size:
+            slot = self.seen
+        else:
+            slot = self.rng.integers(0, self.seen + 1)
+        if slot < size:
+            self.rounds[slot] = self.seen
+            self.budgets[slot] = budgets
+        self.seen += 1
+
+    def report(self) -> dict:
+        n = min(self.seen, len(self.rounds))
+        order = np.argsort(self.rounds[:n])
+        return {"rounds": self.rounds[order], "budgets": self.budgets[order].T}
+
+
+def default_statistics(n_players: int):
+    """The statistics that are collected for every player by default"""
+    return [MeanVariance(n_players), Drawdown(n_players), BustRate(n_players)]
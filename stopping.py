@@ -0,0 +1,56 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from stats import Difference, MeanVariance
+
+
+def half_width(statistic: MeanVariance, confidence: float = 0.95) -> np.ndarray:
+    """Half the width of the confidence interval of the mean of `statistic`"""
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return z * statistic.std_error()
+
+
+def play_until(dealer, precision: float, players=None, difference=None, confidence: float = 0.95,
+               chunk: int = 10000, max_rounds: int = None, verbose: bool = False) -> dict:
+    """
+    Plays rounds in chunks of `chunk` until the expected winnings per round are known
+    to within `precision` (half the width of the `confidence` interval), or `max_rounds` were played.
+
+    By default the precision has to be reached for every player, `players` limits it to the given ones.
+    With `difference=(a, b)` only the difference between the winnings of players `a` and `b`
+    has to be that precise, which needs far fewer rounds than both winnings on their own.
+
+    Returns the number of rounds played, the estimated mean(s), their half widths and
+    whether the precision was reached.
+    """
+    if difference is not None:
+        statistic = Difference(*difference)
+        players = [0]
+    else:
+        statistic = MeanVariance(len(dealer.players))
+        players = list(range(len(dealer.players))) if players is None else list(players)
+    dealer.stats.append(statistic)
+
+    rounds = 0
+    try:
+        while max_rounds is None or rounds < max_rounds:
+            n = chunk if max_rounds is None else min(chunk, max_rounds - rounds)
+            dealer.play(n, verbose=False)
+            rounds += n
+
+            widths = half_width(statistic, confidence)[players]
+            if verbose:
+                print(f"Round {rounds}: +-{widths.max():.3f}")
+            if np.all(widths <= precision):
+                break
+    finally:
+        dealer.stats.remove(statistic)
+
+    widths = half_width(statistic, confidence)
+    return {
+        "rounds": rounds,
+        "mean": statistic.mean.copy(),
+        "half_width": widths,
+        "converged": bool(np.all(widths[players] <= precision)),
+    }
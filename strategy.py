@@ -0,0 +1,113 @@
+import json
+import os
+from enum import Enum
+
+import numpy as np
+
+from deck import Hand, VALUES
+
+
+class Action(Enum):
+    """All possible game decisions a player can make"""
+    HIT = 0
+    STAND = 1
+    DOUBLE_DOWN = 2
+    SPLIT = 3
+
+
+CHART_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts")
+DEFAULT_CHART = os.path.join(CHART_DIR, "basic_strategy.json")
+
+# Letters used in the chart files, '-' means "don't split, play the total"
+CODES = {
+    "H": Action.HIT,
+    "S": Action.STAND,
+    "D": Action.DOUBLE_DOWN,
+    "P": Action.SPLIT,
+    "-": None,
+}
+
+# The columns of a chart are the dealer upcards 2 to 10 and the ace
+UPCARDS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+
+
+class Strategy:
+    """
+    A strategy chart compiled into dense lookup tables.
+
+    Every table is indexed by [player value][dealer upcard value]:
+    hard -- hard totals 0 to 21
+    soft -- soft totals 0 to 21
+    pair -- value of the paired card 0 to 11, None if the pair should not be split
+
+    Charts for tables that don't allow doubling down after a split set "double_after_split" to false.
+    """
+
+    def __init__(self, chart: dict) -> None:
+        self.name = chart.get("name", "")
+        self.double_after_split = chart.get("double_after_split", True)
+        # charts with double down after split don't pay for the check
+        if not self.double_after_split:
+            self.decide = self._decide_without_double_after_split
+        self.hard = self._compile(chart["hard"], 21, Action.HIT)
+        self.soft = self._compile(chart["soft"], 21, Action.HIT)
+        self.pair = self._compile(chart["pair"], 11, None)
+
+    @staticmethod
+    def _rows(key: str):
+        """Parses a row label like '13-16', '9' or 'A' into the values it covers"""
+        bounds = [11 if part == "A" else int(part) for part in key.split("-")]
+        return range(bounds[0], bounds[-1] + 1)
+
+    @staticmethod
+    def _compile(rows: dict, max_value: int, default):
+        table = [[default] * 12 for _ in range(max_value + 1)]
+        for key, row in rows.items():
+            if len(row) != len(UPCARDS):
+                raise ValueError(f"Row '{key}' needs {len(UPCARDS)} entries, got '{row}'")
+            for value in Strategy._rows(key):
+                for upcard, code in zip(UPCARDS, row):
+                    table[value][upcard] = CODES[code]
+
+        return tuple(tuple(row) for row in table)
+
+    @staticmethod
+    def load(path: str) -> "Strategy":
+        """Loads a strategy chart from a JSON file"""
+        with open(path) as f:
+            return Strategy(json.load(f))
+
+    def arrays(self):
+        """
+        Returns the hard, soft and pair tables as int8 arrays of `Action` values,
+        pairs that should not be split are -1.
+        """
+        def encode(table):
+            return np.array([[-1 if action is None else action.value for action in row]
+                             for row in table], dtype=np.int8)
+
+        return encode(self.hard), encode(self.soft), encode(self.pair)
+
+    def decide(self, hand: Hand, upcard: int) -> Action:
+        """
+        Looks up the action for `hand` against the value of the dealers upcard.
+
+        Pairs that should not be split are played like any other total.
+        """
+        if hand.pair:
+            action = self.pair[VALUES[hand.cards[0]]][upcard]
+            if action is not None:
+                return action
+        if hand.soft_aces > 0:
+            return self.soft[hand.total][upcard]
+        return self.hard[hand.total][upcard]
+
+    def _decide_without_double_after_split(self, hand: Hand, upcard: int) -> Action:
+        """Like `decide`, but split hands hit instead of doubling down"""
+        action = Strategy.decide(self, hand, upcard)
+        if action is Action.DOUBLE_DOWN and hand.from_split:
+            return Action.HIT
+        return action
+
+
+BASIC_STRATEGY = Strategy.load(DEFAULT_CHART)
@@ -0,0 +1,123 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from dealer import Dealer
+from deck import Deck
+from player import make_player
+from shoes import ShoePool
+from stats import Drawdown, MeanVariance
+
+# Columns of the result table, one row per player and configuration
+COLUMNS = ("config", "strategy", "name", "number_of_decks", "shuffle_point", "unit", "spread", "rounds",
+           "ev", "std_error", "std", "wins", "draws", "losses", "budget", "max_drawdown")
+
+
+def grid(strategies, rounds: int, number_of_decks=(6,), shuffle_point=(0.75,), unit=(100,), spread=(None,)):
+    """
+    All combinations of the given deck counts, penetrations (shuffle points) and bet spreads
+    of the card counters, as configurations for `sweep`.
+
+    Every configuration plays `rounds` rounds with all `strategies` (numbers of the simulation menu) at one table.
+    """
+    return [
+        {"strategies": "".join(strategies), "rounds": rounds, "number_of_decks": decks,
+         "shuffle_point": point, "unit": u, "spread": s}
+        for decks, point, u, s in itertools.product(number_of_decks, shuffle_point, unit, spread)
+    ]
+
+
+def run_config(index: int, config: dict, seed: int) -> list:
+    """
+    Plays one configuration of a sweep and returns a row of the result table for every player.
+
+    The shoes only depend on the seed and the number of decks, so all configurations
+    with the same number of decks are played with the same shoes and their differences
+    aren't hidden by the luck of the cards.
+    """
+    decks = config["number_of_decks"]
+    shoe_seed = np.random.SeedSequence(seed, spawn_key=(decks,))
+    player_seeds = np.random.SeedSequence(seed, spawn_key=(decks, index)).spawn(len(config["strategies"]))
+
+    players = [make_player(strategy, np.random.default_rng(s), decks, config["unit"], config["spread"])
+               for strategy, s in zip(config["strategies"], player_seeds)]
+    deck = Deck(decks, config["shuffle_point"], shoes=ShoePool(decks, np.random.default_rng(shoe_seed)))
+    stats = [MeanVariance(len(players)), Drawdown(len(players))]
+    dealer = Dealer(deck, players, record_every=0, stats=stats)
+    dealer.play(config["rounds"], verbose=False)
+
+    mean = stats[0].report()
+    drawdown = stats[1].report()["max_drawdown"]
+    return [{
+        "config": index,
+        "strategy": strategy,
+        "name": player.name,
+        "number_of_decks": decks,
+        "shuffle_point": config["shuffle_point"],
+        "unit": config["unit"],
+        "spread": config["spread"],
+        "rounds": config["rounds"],
+        "ev": mean["mean"][i],
+        "std_error": mean["std_error"][i],
+        "std": mean["std"][i],
+        "wins": dealer.wins[i],
+        "draws": dealer.draws[i],
+        "losses": dealer.losses[i],
+        "budget": player.budget,
+        "max_drawdown": drawdown[i],
+    } for i, (strategy, player) in enumerate(zip(config["strategies"], players))]
+
+
+def _cost(config: dict) -> int:
+    """Rough estimate of the time a configuration takes"""
+    return config["rounds"] * (1 + len(config["strategies"]))
+
+
+def sweep(configs, path: str = None, seed: int = None, workers: int = None, verbose: bool = True) -> list:
+    """
+    Plays every configuration in a process pool and returns one table with the rows of all of them,
+    sorted by configuration. With `path` the rows of every configuration are also appended
+    to that CSV file as soon as it is done, so the results of a long sweep that is stopped aren't lost.
+    The file lists the configurations in the order they finished.
+
+    The longest configurations are started first and every worker takes the next one as soon as
+    it is done, so the workers stay busy until the end even if the configurations differ in length.
+    """
+    configs = list(configs)
+    seed = np.random.SeedSequence(seed).entropy
+    workers = os.cpu_count() if workers is None else workers
+    order = sorted(range(len(configs)), key=lambda i: _cost(configs[i]), reverse=True)
+
+    rows = []
+    f = None if path is None else open(path, "w", newline="")
+    writer = None if f is None else csv.DictWriter(f, fieldnames=COLUMNS)
+    if writer is not None:
+        writer.writeheader()
+
+    def done(config_rows, count: int) -> None:
+        rows.extend(config_rows)
+        if writer is not None:
+            writer.writerows(config_rows)
+            f.flush()
+        if verbose:
+            print(f"Configuration {count}/{len(configs)}")
+
+    try:
+        if workers <= 1:
+            for count, i in enumerate(order, 1):
+                done(run_config(i, configs[i], seed), count)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_config, i, configs[i], seed) for i in order]
+                for count, future in enumerate(as_completed(futures), 1):
+                    done(future.result(), count)
+    finally:
+        if f is not None:
+            f.close()
+
+    rows.sort(key=lambda row: row["config"])
+    return rows
+